@@ -0,0 +1,69 @@
+"""Peak memory of concurrent video seekers: buffered reads vs chunked streaming.
+
+Usage: python benchmarks/range_streaming.py [--size-mb 32] [--clients 50]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_ranges import iter_file_range  # noqa: E402
+
+
+async def buffered_client(path: str, length: int):
+    # The previous implementation: f.read(length) of the whole requested span
+    with open(path, "rb") as source:
+        data = source.read(length)
+    await asyncio.sleep(0.01)
+    return len(data)
+
+
+async def streaming_client(path: str, length: int):
+    sent = 0
+    async for chunk in iter_file_range(path, 0, length):
+        sent += len(chunk)
+    return sent
+
+
+async def run_clients(client, path: str, length: int, clients: int):
+    results = await asyncio.gather(*(client(path, length) for _ in range(clients)))
+    assert all(result == length for result in results)
+
+
+def measure(client, path: str, length: int, clients: int) -> int:
+    tracemalloc.start()
+    asyncio.run(run_clients(client, path, length, clients))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--clients", type=int, default=50)
+    args = parser.parse_args()
+
+    length = args.size_mb * 1024 * 1024
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as media:
+        media.write(os.urandom(length))
+        path = media.name
+    try:
+        for name, client in (("buffered", buffered_client), ("streaming", streaming_client)):
+            peak = measure(client, path, length, args.clients)
+            print(
+                f"{name:>9}: {args.clients} clients x bytes=0- of {args.size_mb} MiB "
+                f"-> peak {peak / (1024 * 1024):.1f} MiB"
+            )
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
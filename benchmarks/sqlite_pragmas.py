@@ -0,0 +1,90 @@
+"""SQLite write throughput per pragma profile (progress inserts in autocommit).
+
+Usage: python benchmarks/sqlite_pragmas.py [--writes 2000] [--readers 2]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_backend import (  # noqa: E402
+    SQLITE_PRAGMA_PROFILES,
+    apply_migrations,
+    connect_database,
+    load_database_settings,
+)
+
+PROGRESS_INSERT = """
+    INSERT INTO tutorial_progress (user_id, tutorial_slug)
+    VALUES (?, ?)
+    ON CONFLICT(user_id, tutorial_slug) DO NOTHING
+"""
+
+
+def reader(settings, stop: threading.Event, counter: list[int]):
+    connection = connect_database(settings)
+    cursor = connection.cursor()
+    while not stop.is_set():
+        cursor.execute(
+            "SELECT tutorial_slug FROM tutorial_progress WHERE user_id = ?",
+            (counter[0] % 50,),
+        )
+        cursor.fetchall()
+        counter[0] += 1
+    connection.close()
+
+
+def run_profile(profile: str, writes: int, readers: int) -> tuple[float, int]:
+    directory = tempfile.mkdtemp()
+    settings = load_database_settings(
+        {
+            "SQLITE_DB_PATH": os.path.join(directory, "bench.db"),
+            "SQLITE_PRAGMA_PROFILE": profile,
+        }
+    )
+    connection = connect_database(settings)
+    cursor = connection.cursor()
+    apply_migrations(cursor, settings.backend)
+
+    stop = threading.Event()
+    read_counter = [0]
+    threads = [
+        threading.Thread(target=reader, args=(settings, stop, read_counter))
+        for _ in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    started = time.perf_counter()
+    for index in range(writes):
+        # One autocommit write per tutorial visit, like mark_tutorial_completed
+        cursor.execute(PROGRESS_INSERT, (index % 50, f"tutorial-{index}"))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    connection.close()
+    return writes / elapsed, read_counter[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{args.writes} autocommit inserts, {args.readers} concurrent reader threads")
+    for profile in SQLITE_PRAGMA_PROFILES:
+        writes_per_second, reads = run_profile(profile, args.writes, args.readers)
+        print(f"  {profile:<10} {writes_per_second:>10.0f} writes/s  {reads:>8} reads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Cold template load time in a fresh process, with and without the bytecode cache.
+
+Usage: python benchmarks/template_cold_start.py [--runs 5]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from jinja2 import TemplateSyntaxError  # noqa: E402
+
+from template_cache import (  # noqa: E402
+    compilable_template_names,
+    create_template_environment,
+    precompile_templates,
+)
+
+PAGE_TEMPLATES = (
+    "index.tmpl",
+    "login.tmpl",
+    "register.tmpl",
+    "tutorial.tmpl",
+    "tutorial_course.tmpl",
+    "account.tmpl",
+    "personal_account.tmpl",
+    "forgot.tmpl",
+    "tutorial_viewer.tmpl",
+    "support.tmpl",
+)
+
+
+def measure(bytecode_dir: str | None) -> dict:
+    """Runs in the child process: what a freshly started worker pays."""
+    env = create_template_environment(bytecode_dir)
+    started = time.perf_counter()
+    for template_name in PAGE_TEMPLATES:
+        env.get_template(template_name)
+    pages = time.perf_counter() - started
+
+    slides = [
+        name for name in compilable_template_names(env) if name.startswith("tutorials/")
+    ]
+    slide_times = []
+    for template_name in slides:
+        started = time.perf_counter()
+        try:
+            env.get_template(template_name)
+        except TemplateSyntaxError:
+            continue
+        slide_times.append(time.perf_counter() - started)
+    return {"pages": pages, "slide_max": max(slide_times), "slides": sum(slide_times)}
+
+
+def run_child(bytecode_dir: str | None) -> dict:
+    output = subprocess.check_output(
+        [sys.executable, __file__, "--child", bytecode_dir or "off"], cwd=ROOT
+    )
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(None if args.child == "off" else args.child)))
+        return
+
+    bytecode_dir = tempfile.mkdtemp()
+    compiled, _ = precompile_templates(create_template_environment(bytecode_dir))
+    print(f"{len(compiled)} templates, median of {args.runs} fresh processes")
+    for label, directory in (("no cache", None), ("precompiled", bytecode_dir)):
+        results = [run_child(directory) for _ in range(args.runs)]
+        pages = statistics.median(result["pages"] for result in results) * 1000
+        slide_max = statistics.median(result["slide_max"] for result in results) * 1000
+        slides = statistics.median(result["slides"] for result in results) * 1000
+        print(
+            f"  {label:<12} page templates {pages:7.1f} ms"
+            f"  slowest first slide {slide_max:6.1f} ms  all slides {slides:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,551 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Iterator, Mapping
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUG_REPORTS_PATH = os.path.join(BASE_DIR, "bugreports.jsonl")
+LEGACY_BUG_REPORTS_PATH = os.path.join(BASE_DIR, "bugreports.json")
+DEFAULT_BUG_REPORTS_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BUG_REPORTS_BACKUP_COUNT = 5
+DEFAULT_BUG_REPORTS_QUEUE_SIZE = 1000
+DEFAULT_BUG_REPORTS_BATCH_SIZE = 100
+BUG_REPORTS_RETRY_DELAY = 1.0
+IMPORTED_SUFFIX = ".imported"
+CLAIMED_SUFFIX = ".importing."
+LOCK_SUFFIX = ".lock"
+STATS_SUFFIX = ".stats.sqlite3"
+STATS_FORMAT_VERSION = 1
+STATS_BUSY_TIMEOUT = 5.0
+STATS_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS report_counts ("
+    "day TEXT NOT NULL, kind TEXT NOT NULL, code TEXT NOT NULL, n INTEGER NOT NULL, "
+    "PRIMARY KEY (day, kind, code))",
+    "CREATE TABLE IF NOT EXISTS stats_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+)
+UNKNOWN_STATS_KEY = "unknown"
+
+
+@dataclass(frozen=True)
+class BugReportSettings:
+    path: str = DEFAULT_BUG_REPORTS_PATH
+    max_bytes: int = DEFAULT_BUG_REPORTS_MAX_BYTES
+    backup_count: int = DEFAULT_BUG_REPORTS_BACKUP_COUNT
+    queue_size: int = DEFAULT_BUG_REPORTS_QUEUE_SIZE
+    batch_size: int = DEFAULT_BUG_REPORTS_BATCH_SIZE
+
+
+def load_bug_report_settings(environ: Mapping[str, str] | None = None) -> BugReportSettings:
+    env = os.environ if environ is None else environ
+
+    path = (env.get("BUG_REPORTS_PATH") or "").strip() or DEFAULT_BUG_REPORTS_PATH
+    raw_max_bytes = (env.get("BUG_REPORTS_MAX_BYTES") or "").strip()
+    raw_backup_count = (env.get("BUG_REPORTS_BACKUP_COUNT") or "").strip()
+    raw_queue_size = (env.get("BUG_REPORTS_QUEUE_SIZE") or "").strip()
+    raw_batch_size = (env.get("BUG_REPORTS_BATCH_SIZE") or "").strip()
+    try:
+        max_bytes = int(raw_max_bytes) if raw_max_bytes else DEFAULT_BUG_REPORTS_MAX_BYTES
+        backup_count = (
+            int(raw_backup_count) if raw_backup_count else DEFAULT_BUG_REPORTS_BACKUP_COUNT
+        )
+        queue_size = int(raw_queue_size) if raw_queue_size else DEFAULT_BUG_REPORTS_QUEUE_SIZE
+        batch_size = int(raw_batch_size) if raw_batch_size else DEFAULT_BUG_REPORTS_BATCH_SIZE
+    except ValueError as exc:
+        raise ValueError(
+            "BUG_REPORTS_MAX_BYTES, BUG_REPORTS_BACKUP_COUNT, BUG_REPORTS_QUEUE_SIZE "
+            "and BUG_REPORTS_BATCH_SIZE must be integers."
+        ) from exc
+    if max_bytes < 0 or backup_count < 0:
+        raise ValueError("BUG_REPORTS_MAX_BYTES and BUG_REPORTS_BACKUP_COUNT must be >= 0.")
+    if queue_size < 1 or batch_size < 1:
+        raise ValueError("BUG_REPORTS_QUEUE_SIZE and BUG_REPORTS_BATCH_SIZE must be positive.")
+
+    return BugReportSettings(
+        path=path,
+        max_bytes=max_bytes,
+        backup_count=backup_count,
+        queue_size=queue_size,
+        batch_size=batch_size,
+    )
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """Exclusive lock held by one process at a time, across processes."""
+    descriptor = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(descriptor, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(descriptor, msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(descriptor, fcntl.LOCK_UN)
+            else:
+                os.lseek(descriptor, 0, os.SEEK_SET)
+                msvcrt.locking(descriptor, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(descriptor)
+
+
+def encode_report(report: dict) -> bytes:
+    return (json.dumps(report, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def stats_path_for(path: str) -> str:
+    return os.path.splitext(path)[0] + STATS_SUFFIX
+
+
+def report_day(report: dict) -> str:
+    created_at = report.get("created_at")
+    if isinstance(created_at, str) and len(created_at) >= 10:
+        return created_at[:10]
+    return UNKNOWN_STATS_KEY
+
+
+def count_reports(reports: Iterable[dict]) -> dict[tuple[str, str, str], int]:
+    """Number of reports per ``(day, kind, code)``."""
+    counts: dict[tuple[str, str, str], int] = {}
+    for report in reports:
+        key = (
+            report_day(report),
+            str(report.get("report_kind") or UNKNOWN_STATS_KEY),
+            str(report.get("report_code") or UNKNOWN_STATS_KEY),
+        )
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+class BugReportStats:
+    """Report counts by kind, code and UTC day, shared by worker processes.
+
+    Counts live in a small SQLite file next to the report file. Each batch
+    is added with ``n = n + ?`` in one transaction, so every process that
+    appends reports counts into the same table and reads the combined
+    totals, and serving them never scans the report history. A missing or
+    unreadable stats file is rebuilt from the reports once.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._lock = threading.Lock()
+        # One connection, used under self._lock from any thread
+        self._connection = sqlite3.connect(
+            path or ":memory:",
+            timeout=STATS_BUSY_TIMEOUT,
+            autocommit=True,
+            check_same_thread=False,
+        )
+        for statement in STATS_SCHEMA:
+            self._connection.execute(statement)
+
+    @classmethod
+    def load_or_rebuild(cls, path: str, reports: Iterable[dict]) -> "BugReportStats":
+        try:
+            stats = cls(path)
+        except sqlite3.DatabaseError:
+            # Not a stats database (e.g. a torn file): start over
+            os.remove(path)
+            stats = cls(path)
+        if stats._is_built():
+            return stats
+        # Counted before taking the write lock, so other workers are not kept waiting
+        counts = count_reports(reports)
+        with stats._lock, stats._transaction() as cursor:
+            # Workers starting together: only the first one stores its count
+            if not stats._is_built(cursor):
+                stats._replace_locked(cursor, counts)
+        return stats
+
+    @contextmanager
+    def _transaction(self):
+        cursor = self._connection.cursor()
+        # IMMEDIATE takes the write lock up front, so concurrent batches queue up
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            yield cursor
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+        cursor.execute("COMMIT")
+
+    def _is_built(self, cursor=None) -> bool:
+        cursor = cursor or self._connection.cursor()
+        cursor.execute("SELECT value FROM stats_meta WHERE key = 'version'")
+        row = cursor.fetchone()
+        return row is not None and row[0] == str(STATS_FORMAT_VERSION)
+
+    @staticmethod
+    def _add_locked(cursor, counts: Mapping[tuple[str, str, str], int]):
+        cursor.executemany(
+            "INSERT INTO report_counts (day, kind, code, n) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (day, kind, code) DO UPDATE SET n = n + excluded.n",
+            [(*key, n) for key, n in counts.items()],
+        )
+
+    def _replace_locked(self, cursor, counts: Mapping[tuple[str, str, str], int]):
+        cursor.execute("DELETE FROM report_counts")
+        self._add_locked(cursor, counts)
+        cursor.execute(
+            "INSERT INTO stats_meta (key, value) VALUES ('version', ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (str(STATS_FORMAT_VERSION),),
+        )
+
+    def record(self, reports: Iterable[dict]):
+        counts = count_reports(reports)
+        with self._lock, self._transaction() as cursor:
+            self._add_locked(cursor, counts)
+
+    def rebuild(self, reports: Iterable[dict]):
+        counts = count_reports(reports)
+        with self._lock, self._transaction() as cursor:
+            self._replace_locked(cursor, counts)
+
+    @property
+    def total(self) -> int:
+        with self._lock:
+            row = self._connection.execute("SELECT SUM(n) FROM report_counts").fetchone()
+        return row[0] or 0
+
+    def snapshot(self, days: int | None = None, today: date | None = None) -> dict:
+        """Counts for the API; ``days`` limits ``by_day`` to the last N days."""
+        since = None
+        if days is not None:
+            today = today or datetime.now(timezone.utc).date()
+            since = (today - timedelta(days=days - 1)).isoformat()
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT day, kind, code, n FROM report_counts ORDER BY day, code"
+            ).fetchall()
+        total = 0
+        by_kind: dict[str, int] = {}
+        by_code: dict[str, int] = {}
+        by_day: dict[str, dict] = {}
+        for day, kind, code, n in rows:
+            total += n
+            by_kind[kind] = by_kind.get(kind, 0) + n
+            by_code[code] = by_code.get(code, 0) + n
+            if since is not None and (day == UNKNOWN_STATS_KEY or day < since):
+                continue
+            day_counts = by_day.setdefault(day, {"total": 0, "by_code": {}})
+            day_counts["total"] += n
+            day_counts["by_code"][code] = day_counts["by_code"].get(code, 0) + n
+        return {"total": total, "by_kind": by_kind, "by_code": by_code, "by_day": by_day}
+
+
+class BugReportStore:
+    """Append-only JSON Lines sink for support reports.
+
+    Each report is one line written with a single ``write`` on an
+    ``O_APPEND`` descriptor followed by ``fsync``, so concurrent writers
+    never lose or interleave reports and nothing is rewritten. When the
+    file would grow past ``max_bytes`` it is rotated to ``<path>.1`` …
+    ``<path>.<backup_count>`` (``max_bytes=0`` disables rotation).
+    Written reports are also counted in ``stats`` when it is set.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_BUG_REPORTS_PATH,
+        max_bytes: int = DEFAULT_BUG_REPORTS_MAX_BYTES,
+        backup_count: int = DEFAULT_BUG_REPORTS_BACKUP_COUNT,
+        stats: BugReportStats | None = None,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.stats = stats
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: BugReportSettings) -> "BugReportStore":
+        store = cls(settings.path, settings.max_bytes, settings.backup_count)
+        store.stats = BugReportStats.load_or_rebuild(
+            stats_path_for(settings.path), store.iter_reports()
+        )
+        return store
+
+    def rotated_path(self, index: int) -> str:
+        return f"{self.path}.{index}"
+
+    def _should_rotate(self, incoming: int) -> bool:
+        if self.max_bytes <= 0:
+            return False
+        try:
+            size = os.stat(self.path).st_size
+        except FileNotFoundError:
+            return False
+        return size > 0 and size + incoming > self.max_bytes
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.rotated_path(index)
+            if os.path.exists(source):
+                os.replace(source, self.rotated_path(index + 1))
+        os.replace(self.path, self.rotated_path(1))
+
+    def _write_lines(self, data: bytes):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self._should_rotate(len(data)):
+            # self._lock only covers this process; other workers rotate the same file
+            with file_lock(self.path + LOCK_SUFFIX):
+                if self._should_rotate(len(data)):
+                    self._rotate()
+        descriptor = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(descriptor, data)
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def append(self, report: dict):
+        data = encode_report(report)
+        with self._lock:
+            self._write_lines(data)
+        if self.stats is not None:
+            self.stats.record([report])
+
+    def append_many(self, reports: list[dict]) -> int:
+        if not reports:
+            return 0
+        data = b"".join(encode_report(report) for report in reports)
+        with self._lock:
+            self._write_lines(data)
+        if self.stats is not None:
+            self.stats.record(reports)
+        return len(reports)
+
+    def files(self) -> list[str]:
+        """Existing report files, oldest first."""
+        paths = [self.rotated_path(index) for index in range(self.backup_count, 0, -1)]
+        paths.append(self.path)
+        return [path for path in paths if os.path.exists(path)]
+
+    def iter_reports(self) -> Iterator[dict]:
+        for path in self.files():
+            with open(path, encoding="utf-8") as reports_file:
+                for line in reports_file:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line after a crash must not hide the rest
+                        continue
+
+
+class BugReportQueue:
+    """Bounded in-memory queue in front of a ``BugReportStore``.
+
+    ``submit`` only enqueues, so request handlers never wait for the disk.
+    A background task started on the first submit writes queued reports in
+    batches of up to ``batch_size`` from a worker thread. When ``max_size``
+    reports are already waiting ``submit`` returns ``False`` and the caller
+    should ask the client to retry later. A failed batch goes back to the
+    head of the queue and is retried after ``retry_delay`` seconds.
+    """
+
+    def __init__(
+        self,
+        store: BugReportStore,
+        max_size: int = DEFAULT_BUG_REPORTS_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BUG_REPORTS_BATCH_SIZE,
+        retry_delay: float = BUG_REPORTS_RETRY_DELAY,
+    ):
+        self.store = store
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self._pending: deque[dict] = deque()
+        self._wakeup: asyncio.Event | None = None
+        self._flush_lock: asyncio.Lock | None = None
+        self._worker: asyncio.Task | None = None
+        self.enqueued = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed_batches = 0
+
+    @classmethod
+    def from_settings(cls, store: BugReportStore, settings: BugReportSettings) -> "BugReportQueue":
+        return cls(store, max_size=settings.queue_size, batch_size=settings.batch_size)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, report: dict) -> bool:
+        if len(self._pending) >= self.max_size:
+            self.rejected += 1
+            return False
+        self._pending.append(report)
+        self.enqueued += 1
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._drain_forever())
+        self._wakeup.set()
+        return True
+
+    def take_pending(self) -> list[dict]:
+        reports = list(self._pending)
+        self._pending.clear()
+        return reports
+
+    async def flush(self) -> int:
+        """Write one batch; returns the number of reports written."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popleft())
+            if not batch:
+                return 0
+            try:
+                await asyncio.to_thread(self.store.append_many, batch)
+            except OSError:
+                self.failed_batches += 1
+                self._pending.extendleft(reversed(batch))
+                traceback.print_exc()
+                return 0
+            self.written += len(batch)
+            return len(batch)
+
+    async def _drain_forever(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                if not await self.flush():
+                    await asyncio.sleep(self.retry_delay)
+
+    async def close(self) -> int:
+        """Stop the background writer and write everything still queued."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        if self._worker is not None:
+            # Cancel only between batches: a batch cancelled mid-write is lost
+            async with self._flush_lock:
+                self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        written = 0
+        while self._pending:
+            flushed = await self.flush()
+            if not flushed:
+                break
+            written += flushed
+        return written
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "enqueued": self.enqueued,
+            "rejected": self.rejected,
+            "written": self.written,
+            "failed_batches": self.failed_batches,
+        }
+
+
+def load_legacy_reports(path: str) -> list[dict]:
+    try:
+        with open(path, encoding="utf-8-sig") as reports_file:
+            content = reports_file.read()
+    except FileNotFoundError:
+        return []
+    if not content.strip():
+        return []
+    data = json.loads(content)
+    if not isinstance(data, list):
+        raise ValueError(f"{path} does not contain a JSON array of reports.")
+    return [report for report in data if isinstance(report, dict)]
+
+
+def import_legacy_reports(
+    store: BugReportStore, legacy_path: str = LEGACY_BUG_REPORTS_PATH, strict: bool = True
+) -> int:
+    """Move reports from the old ``bugreports.json`` array into the store.
+
+    Every worker runs the import at startup, so the file is first claimed
+    by renaming it to a per-process name; the workers that lose the rename
+    import nothing. After the import it is renamed to
+    ``<legacy_path>.imported``, so running the import again is a no-op.
+    With ``strict=False`` an unreadable legacy file (for example one torn
+    by the old non-atomic rewrite) is reported and left in place instead
+    of raising.
+    """
+    claimed_path = f"{legacy_path}{CLAIMED_SUFFIX}{os.getpid()}"
+    try:
+        os.replace(legacy_path, claimed_path)
+    except FileNotFoundError:
+        # No legacy file, or another worker has claimed it
+        return 0
+    except OSError as exc:
+        if strict:
+            raise
+        print(f"Skipped importing {legacy_path}: {exc}")
+        return 0
+    try:
+        imported = store.append_many(load_legacy_reports(claimed_path))
+    except (OSError, ValueError) as exc:
+        os.replace(claimed_path, legacy_path)
+        if strict:
+            raise
+        print(f"Skipped importing {legacy_path}: {exc}")
+        return 0
+    if not imported:
+        os.replace(claimed_path, legacy_path)
+        return 0
+    os.replace(claimed_path, legacy_path + IMPORTED_SUFFIX)
+    return imported
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Support report storage tools.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    import_command = subcommands.add_parser(
+        "import", help="append reports from the legacy bugreports.json array"
+    )
+    import_command.add_argument("legacy_path", nargs="?", default=LEGACY_BUG_REPORTS_PATH)
+    subcommands.add_parser(
+        "rebuild-stats", help="recount report statistics from the report files"
+    )
+    args = parser.parse_args(argv)
+
+    store = BugReportStore.from_settings(load_bug_report_settings())
+    if args.command == "import":
+        imported = import_legacy_reports(store, args.legacy_path)
+        print(f"Imported reports: {imported} -> {store.path}")
+    elif args.command == "rebuild-stats":
+        store.stats.rebuild(store.iter_reports())
+        print(f"Reports counted: {store.stats.total} -> {store.stats.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+_MISSING = object()
+
+
+def parse_cache_ttl(raw_value: str | None, default: float) -> float:
+    value = (raw_value or "").strip()
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError as exc:
+        raise ValueError("Cache TTL must be a number of seconds.") from exc
+
+
+def parse_cache_entries(raw_value: str | None, default: int) -> int:
+    value = (raw_value or "").strip()
+    if not value:
+        return default
+    try:
+        return max(int(value), 0)
+    except ValueError as exc:
+        raise ValueError("Cache size must be an integer number of entries.") from exc
+
+
+class LRUCache:
+    """Small in-process LRU with optional entry, byte and TTL limits."""
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        ttl: float | None = None,
+        sizeof: Callable[[Any], int] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof or (lambda value: 1)
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[Any, int, float | None]] = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True):
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, _, expires_at = entry
+            if expires_at is None or expires_at > self._clock():
+                self._entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            self._discard(key)
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any):
+        size = self._sizeof(value)
+        self._discard(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (value, size, expires_at)
+        self.total_bytes += size
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            oldest_key = next(iter(self._entries))
+            self._discard(oldest_key)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        self._discard(key)
+        return entry[0]
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+try:
+    import brotli
+except ImportError:  # brotli is an optional dependency
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".html", ".htm", ".svg", ".json", ".txt")
+PRECOMPRESS_ROOTS = ("static", "assets", os.path.join("templates", "tutorials"))
+PRECOMPRESS_MIN_SIZE = 512
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+ENCODING_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+
+DEFAULT_RESPONSE_MIN_SIZE = 1024
+DEFAULT_RESPONSE_GZIP_LEVEL = 6
+DEFAULT_RESPONSE_BROTLI_QUALITY = 5
+# Already-compressed formats: compressing them again only burns CPU
+SKIP_COMPRESSION_CONTENT_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "font/woff2",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-brotli",
+    "application/pdf",
+    "application/octet-stream",
+)
+COMPRESSIBLE_IMAGE_TYPES = ("image/svg+xml",)
+
+
+@dataclass(frozen=True)
+class CompressionSettings:
+    enabled: bool = True
+    min_size: int = DEFAULT_RESPONSE_MIN_SIZE
+    gzip_level: int = DEFAULT_RESPONSE_GZIP_LEVEL
+    brotli_quality: int = DEFAULT_RESPONSE_BROTLI_QUALITY
+    skip_content_types: tuple[str, ...] = SKIP_COMPRESSION_CONTENT_TYPES
+
+
+def _parse_int_setting(raw_value: str | None, name: str, default: int, low: int, high: int) -> int:
+    value = (raw_value or "").strip()
+    if not value:
+        return default
+    try:
+        parsed = int(value)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be an integer.") from exc
+    if not low <= parsed <= high:
+        raise ValueError(f"{name} must be between {low} and {high}.")
+    return parsed
+
+
+def load_compression_settings(environ: Mapping[str, str] | None = None) -> CompressionSettings:
+    env = os.environ if environ is None else environ
+
+    enabled = (env.get("RESPONSE_COMPRESSION") or "on").strip().lower()
+    if enabled not in ("on", "off", "1", "0", "true", "false"):
+        raise ValueError("RESPONSE_COMPRESSION must be 'on' or 'off'.")
+
+    skip_content_types = SKIP_COMPRESSION_CONTENT_TYPES
+    extra_skip = env.get("RESPONSE_COMPRESSION_SKIP_TYPES") or ""
+    if extra_skip.strip():
+        skip_content_types += tuple(
+            item.strip().lower() for item in extra_skip.split(",") if item.strip()
+        )
+
+    return CompressionSettings(
+        enabled=enabled in ("on", "1", "true"),
+        min_size=_parse_int_setting(
+            env.get("RESPONSE_COMPRESSION_MIN_BYTES"),
+            "RESPONSE_COMPRESSION_MIN_BYTES",
+            DEFAULT_RESPONSE_MIN_SIZE,
+            0,
+            2**31,
+        ),
+        gzip_level=_parse_int_setting(
+            env.get("RESPONSE_COMPRESSION_GZIP_LEVEL"),
+            "RESPONSE_COMPRESSION_GZIP_LEVEL",
+            DEFAULT_RESPONSE_GZIP_LEVEL,
+            1,
+            9,
+        ),
+        brotli_quality=_parse_int_setting(
+            env.get("RESPONSE_COMPRESSION_BROTLI_QUALITY"),
+            "RESPONSE_COMPRESSION_BROTLI_QUALITY",
+            DEFAULT_RESPONSE_BROTLI_QUALITY,
+            0,
+            11,
+        ),
+        skip_content_types=skip_content_types,
+    )
+
+
+def is_compressible(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def parse_accept_encoding(header: str | None) -> dict[str, float]:
+    encodings = {}
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def accepts_encoding(accepted: dict[str, float], encoding: str) -> bool:
+    if encoding in accepted:
+        return accepted[encoding] > 0
+    return accepted.get("*", 0) > 0
+
+
+def select_precompressed(path: str, accept_encoding: str | None):
+    """Return ``(path, encoding)`` of the best fresh precompressed variant.
+
+    Falls back to ``(path, None)`` when the client accepts none of the
+    available encodings or the variant is older than the original file.
+    """
+    accepted = parse_accept_encoding(accept_encoding)
+    if not accepted:
+        return path, None
+    try:
+        original_mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return path, None
+    for encoding, suffix in ENCODING_SUFFIXES:
+        if not accepts_encoding(accepted, encoding):
+            continue
+        variant_path = path + suffix
+        try:
+            variant_mtime = os.stat(variant_path).st_mtime_ns
+        except OSError:
+            continue
+        if variant_mtime >= original_mtime:
+            return variant_path, encoding
+    return path, None
+
+
+def is_compressible_content_type(
+    content_type: str | None,
+    skip_content_types: Iterable[str] = SKIP_COMPRESSION_CONTENT_TYPES,
+) -> bool:
+    mime_type = (content_type or "").split(";", 1)[0].strip().lower()
+    if not mime_type:
+        return False
+    if mime_type in COMPRESSIBLE_IMAGE_TYPES:
+        return True
+    return not any(mime_type.startswith(prefix) for prefix in skip_content_types)
+
+
+def choose_response_encoding(accept_encoding: str | None) -> str | None:
+    accepted = parse_accept_encoding(accept_encoding)
+    for encoding, _ in ENCODING_SUFFIXES:
+        if encoding == "br" and brotli is None:
+            continue
+        if accepts_encoding(accepted, encoding):
+            return encoding
+    return None
+
+
+def compress_body(data: bytes, encoding: str, settings: CompressionSettings) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=settings.brotli_quality)
+    return gzip.compress(data, compresslevel=settings.gzip_level, mtime=0)
+
+
+def _append_vary(headers, value: str):
+    current = headers.get("Vary")
+    if not current:
+        headers["Vary"] = value
+        return
+    names = [name.strip() for name in current.split(",")]
+    if "*" not in names and value.lower() not in (name.lower() for name in names):
+        headers["Vary"] = f"{current}, {value}"
+
+
+def negotiated_etag(request, etag: str, content_type: str, settings: CompressionSettings) -> str:
+    """The ETag a response of ``content_type`` carries for this request.
+
+    ``compress_response`` weakens the ETag of bodies it compresses, but a
+    304 has no body to compress. Handlers that answer conditional requests
+    call this for both their 200 and 304, so the two always share one
+    validator: weak whenever the client negotiated an encoding.
+    """
+    if (
+        settings.enabled
+        and not etag.startswith("W/")
+        and is_compressible_content_type(content_type, settings.skip_content_types)
+        and choose_response_encoding(request.headers.get("Accept-Encoding")) is not None
+    ):
+        return "W/" + etag
+    return etag
+
+
+def compress_response(request, response, settings: CompressionSettings):
+    """Compress a buffered response body in place when the client accepts it.
+
+    Streamed bodies (files, generators), ranges and responses that already
+    carry a ``Content-Encoding`` are left untouched.
+    """
+    if not settings.enabled or response.status_code not in (200, 304):
+        return response
+    headers = response.headers
+    if "Content-Encoding" in headers or "Content-Range" in headers:
+        return response
+    if "no-transform" in (headers.get("Cache-Control") or "").lower():
+        return response
+    content_type = headers.get("Content-Type", "text/plain")
+    if not is_compressible_content_type(content_type, settings.skip_content_types):
+        return response
+
+    _append_vary(headers, "Accept-Encoding")
+    body = response.body
+    if response.status_code != 200 or not isinstance(body, bytes):
+        return response
+    if len(body) < max(settings.min_size, 1):
+        return response
+    encoding = choose_response_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+
+    compressed = compress_body(body, encoding, settings)
+    if len(compressed) >= len(body):
+        return response
+    response.body = compressed
+    headers["Content-Encoding"] = encoding
+    if "Content-Length" in headers:
+        del headers["Content-Length"]
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        # The compressed representation is no longer byte-identical
+        headers["ETag"] = "W/" + etag
+    return response
+
+
+def install_response_compression(app, settings: CompressionSettings | None = None):
+    settings = settings or load_compression_settings()
+
+    @app.after_request
+    def _compress_response(request, response):
+        return compress_response(request, response, settings)
+
+    return settings
+
+
+def _write_variant(path: str, suffix: str, data: bytes, original_size: int, original_stat) -> bool:
+    variant_path = path + suffix
+    if len(data) >= original_size:
+        if os.path.exists(variant_path):
+            os.remove(variant_path)
+        return False
+    with open(variant_path, "wb") as variant:
+        variant.write(data)
+    os.utime(variant_path, ns=(original_stat.st_atime_ns, original_stat.st_mtime_ns))
+    return True
+
+
+def precompress_file(path: str, min_size: int = PRECOMPRESS_MIN_SIZE) -> list[str]:
+    original_stat = os.stat(path)
+    if original_stat.st_size < min_size:
+        return []
+    with open(path, "rb") as source:
+        data = source.read()
+
+    written = []
+    gzip_data = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if _write_variant(path, ".gz", gzip_data, len(data), original_stat):
+        written.append(path + ".gz")
+    if brotli is not None:
+        brotli_data = brotli.compress(data, quality=BROTLI_QUALITY)
+        if _write_variant(path, ".br", brotli_data, len(data), original_stat):
+            written.append(path + ".br")
+    return written
+
+
+def iter_compressible_files(roots: Iterable[str]):
+    for root in roots:
+        for directory, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                if is_compressible(filename):
+                    yield os.path.join(directory, filename)
+
+
+def precompress_tree(roots: Iterable[str] = PRECOMPRESS_ROOTS, min_size: int = PRECOMPRESS_MIN_SIZE):
+    written = []
+    for path in iter_compressible_files(roots):
+        written.extend(precompress_file(path, min_size=min_size))
+    return written
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Static asset compression tools.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    precompress = subcommands.add_parser(
+        "precompress",
+        help="write .gz (and .br, if brotli is installed) next to text assets",
+    )
+    precompress.add_argument("roots", nargs="*", default=list(PRECOMPRESS_ROOTS))
+    precompress.add_argument("--min-size", type=int, default=PRECOMPRESS_MIN_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.command == "precompress":
+        written = precompress_tree(args.roots, min_size=args.min_size)
+        for path in written:
+            print(path)
+        if brotli is None:
+            print("brotli is not installed: only .gz variants were written")
+        print(f"Precompressed files written: {len(written)}")
+
+
+if __name__ == "__main__":
+    main()
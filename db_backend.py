@@ -1,17 +1,78 @@
 from __future__ import annotations
 
+import argparse
+import asyncio
+import inspect
 import os
 import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 from dataclasses import dataclass
-from typing import Any, Iterable, Mapping
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Mapping
 from urllib.parse import quote_plus, urlencode, urlparse, urlunparse
 
+from phone_numbers import normalize_phone_digits
+
 
 @dataclass(frozen=True)
 class DatabaseSettings:
     backend: str
     dsn: str
     sqlite_path: str | None = None
+    sqlite_pragmas: tuple[tuple[str, str], ...] = ()
+
+
+SQLITE_PRAGMA_PROFILES: dict[str, dict[str, str]] = {
+    # SQLite defaults: rollback journal, fsync on every commit
+    "default": {},
+    # Single-node production: readers do not block the writer, commits skip the fsync
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": "5000",
+        "cache_size": "-20000",
+        "mmap_size": str(256 * 1024 * 1024),
+        "temp_store": "MEMORY",
+    },
+}
+DEFAULT_SQLITE_PRAGMA_PROFILE = "production"
+SQLITE_PRAGMA_ENV_VARS = {
+    "journal_mode": "SQLITE_JOURNAL_MODE",
+    "synchronous": "SQLITE_SYNCHRONOUS",
+    "busy_timeout": "SQLITE_BUSY_TIMEOUT_MS",
+    "cache_size": "SQLITE_CACHE_SIZE",
+    "mmap_size": "SQLITE_MMAP_SIZE",
+    "temp_store": "SQLITE_TEMP_STORE",
+}
+_SQLITE_PRAGMA_CHOICES = {
+    "journal_mode": ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"),
+    "synchronous": ("OFF", "NORMAL", "FULL", "EXTRA"),
+    "temp_store": ("DEFAULT", "FILE", "MEMORY"),
+}
+
+
+DEFAULT_POOL_MIN_SIZE = 1
+DEFAULT_POOL_MAX_SIZE = 10
+DEFAULT_POOL_IDLE_TIMEOUT = 300.0
+DEFAULT_POOL_ACQUIRE_TIMEOUT = 30.0
+DEFAULT_POOL_HEALTH_CHECK_INTERVAL = 30.0
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    min_size: int = DEFAULT_POOL_MIN_SIZE
+    max_size: int = DEFAULT_POOL_MAX_SIZE
+    idle_timeout: float = DEFAULT_POOL_IDLE_TIMEOUT
+    acquire_timeout: float = DEFAULT_POOL_ACQUIRE_TIMEOUT
+    health_check_interval: float = DEFAULT_POOL_HEALTH_CHECK_INTERVAL
+
+
+class PoolTimeout(RuntimeError):
+    pass
 
 
 def normalize_database_url(raw_url: str) -> str:
@@ -68,6 +129,37 @@ def build_postgres_url_from_parts(environ: Mapping[str, str]) -> str:
     return dsn
 
 
+def _normalize_pragma_value(name: str, raw_value: str, env_name: str) -> str:
+    value = raw_value.strip().upper()
+    choices = _SQLITE_PRAGMA_CHOICES.get(name)
+    if choices is not None:
+        if value not in choices:
+            raise ValueError(f"{env_name} must be one of: {', '.join(choices)}.")
+        return value
+    try:
+        return str(int(value))
+    except ValueError as exc:
+        raise ValueError(f"{env_name} must be an integer.") from exc
+
+
+def load_sqlite_pragmas(environ: Mapping[str, str]) -> tuple[tuple[str, str], ...]:
+    profile_name = (
+        environ.get("SQLITE_PRAGMA_PROFILE") or DEFAULT_SQLITE_PRAGMA_PROFILE
+    ).strip().lower()
+    if profile_name not in SQLITE_PRAGMA_PROFILES:
+        raise ValueError(
+            "SQLITE_PRAGMA_PROFILE must be one of: "
+            f"{', '.join(SQLITE_PRAGMA_PROFILES)}."
+        )
+
+    pragmas = dict(SQLITE_PRAGMA_PROFILES[profile_name])
+    for name, env_name in SQLITE_PRAGMA_ENV_VARS.items():
+        raw_value = environ.get(env_name) or ""
+        if raw_value.strip():
+            pragmas[name] = _normalize_pragma_value(name, raw_value, env_name)
+    return tuple(pragmas.items())
+
+
 def load_database_settings(environ: Mapping[str, str] | None = None) -> DatabaseSettings:
     env = os.environ if environ is None else environ
 
@@ -81,6 +173,7 @@ def load_database_settings(environ: Mapping[str, str] | None = None) -> Database
                 backend="sqlite",
                 dsn=raw_database_url,
                 sqlite_path=sqlite_path,
+                sqlite_pragmas=load_sqlite_pragmas(env),
             )
         raise ValueError(
             "Unsupported DATABASE_URL scheme. Use postgresql:// or sqlite:///"
@@ -92,7 +185,53 @@ def load_database_settings(environ: Mapping[str, str] | None = None) -> Database
 
     sqlite_path = (env.get("SQLITE_DB_PATH") or "database.db").strip() or "database.db"
     sqlite_dsn = f"sqlite:///{sqlite_path}"
-    return DatabaseSettings(backend="sqlite", dsn=sqlite_dsn, sqlite_path=sqlite_path)
+    return DatabaseSettings(
+        backend="sqlite",
+        dsn=sqlite_dsn,
+        sqlite_path=sqlite_path,
+        sqlite_pragmas=load_sqlite_pragmas(env),
+    )
+
+
+def _parse_number(raw_value: str | None, name: str, default, cast):
+    value = (raw_value or "").strip()
+    if not value:
+        return default
+    try:
+        parsed = cast(value)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number.") from exc
+    if parsed < 0:
+        raise ValueError(f"{name} must not be negative.")
+    return parsed
+
+
+def load_pool_settings(environ: Mapping[str, str] | None = None) -> PoolSettings:
+    env = os.environ if environ is None else environ
+
+    min_size = _parse_number(env.get("DB_POOL_MIN_SIZE"), "DB_POOL_MIN_SIZE", DEFAULT_POOL_MIN_SIZE, int)
+    max_size = _parse_number(env.get("DB_POOL_MAX_SIZE"), "DB_POOL_MAX_SIZE", DEFAULT_POOL_MAX_SIZE, int)
+    if max_size < 1:
+        raise ValueError("DB_POOL_MAX_SIZE must be at least 1.")
+    if min_size > max_size:
+        raise ValueError("DB_POOL_MIN_SIZE must not exceed DB_POOL_MAX_SIZE.")
+
+    return PoolSettings(
+        min_size=min_size,
+        max_size=max_size,
+        idle_timeout=_parse_number(
+            env.get("DB_POOL_IDLE_TIMEOUT"), "DB_POOL_IDLE_TIMEOUT", DEFAULT_POOL_IDLE_TIMEOUT, float
+        ),
+        acquire_timeout=_parse_number(
+            env.get("DB_POOL_TIMEOUT"), "DB_POOL_TIMEOUT", DEFAULT_POOL_ACQUIRE_TIMEOUT, float
+        ),
+        health_check_interval=_parse_number(
+            env.get("DB_POOL_HEALTH_CHECK_INTERVAL"),
+            "DB_POOL_HEALTH_CHECK_INTERVAL",
+            DEFAULT_POOL_HEALTH_CHECK_INTERVAL,
+            float,
+        ),
+    )
 
 
 def redact_dsn(dsn: str) -> str:
@@ -116,23 +255,55 @@ def redact_dsn(dsn: str) -> str:
     return urlunparse(parsed._replace(netloc=masked_netloc))
 
 
+ADAPTED_QUERY_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=ADAPTED_QUERY_CACHE_SIZE)
+def _adapt_postgres_query(query: str) -> str:
+    return query.replace("?", "%s")
+
+
 def _adapt_query(query: str, backend: str) -> str:
     if backend == "postgresql":
-        return query.replace("?", "%s")
+        return _adapt_postgres_query(query)
     return query
 
 
+def query_cache_stats() -> dict:
+    """Hit/miss counters of the adapted query cache (PostgreSQL placeholders)."""
+    info = _adapt_postgres_query.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "entries": info.currsize,
+        "max_entries": info.maxsize,
+    }
+
+
+def _execute_options(backend: str, prepare: bool | None) -> dict:
+    # psycopg prepares server-side on demand; sqlite3 already caches statements per connection
+    if prepare is None or backend != "postgresql":
+        return {}
+    return {"prepare": prepare}
+
+
 class CompatCursor:
     def __init__(self, raw_cursor: Any, backend: str):
         self._raw_cursor = raw_cursor
         self._backend = backend
 
-    def execute(self, query: str, params: Iterable[Any] | None = None):
+    def execute(
+        self,
+        query: str,
+        params: Iterable[Any] | None = None,
+        prepare: bool | None = None,
+    ):
         adapted_query = _adapt_query(query, self._backend)
+        options = _execute_options(self._backend, prepare)
         if params is None:
-            self._raw_cursor.execute(adapted_query)
+            self._raw_cursor.execute(adapted_query, **options)
         else:
-            self._raw_cursor.execute(adapted_query, tuple(params))
+            self._raw_cursor.execute(adapted_query, tuple(params), **options)
         return self
 
     def executemany(self, query: str, seq_of_params: Iterable[Iterable[Any]]):
@@ -171,7 +342,13 @@ class CompatConnection:
 def connect_database(settings: DatabaseSettings) -> CompatConnection:
     if settings.backend == "sqlite":
         sqlite_path = settings.sqlite_path or "database.db"
-        raw_connection = sqlite3.connect(sqlite_path, autocommit=True)
+        # The pool hands a connection to one thread at a time
+        raw_connection = sqlite3.connect(
+            sqlite_path, autocommit=True, check_same_thread=False
+        )
+        # Values are validated by load_sqlite_pragmas; PRAGMA does not accept parameters
+        for name, value in settings.sqlite_pragmas:
+            raw_connection.execute(f"PRAGMA {name} = {value}")
         return CompatConnection(raw_connection, backend="sqlite")
 
     if settings.backend == "postgresql":
@@ -190,49 +367,754 @@ def connect_database(settings: DatabaseSettings) -> CompatConnection:
     raise ValueError(f"Unsupported database backend: {settings.backend}")
 
 
-def initialize_schema(cursor: CompatCursor, backend: str):
-    if backend == "postgresql":
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id BIGSERIAL PRIMARY KEY,
-                tel TEXT NOT NULL UNIQUE,
-                name TEXT NOT NULL,
-                pass TEXT NOT NULL,
-                admin INTEGER DEFAULT 0
-            )
-            """
+def is_integrity_error(exc: BaseException) -> bool:
+    """True for a constraint violation (e.g. a duplicate key) on either backend."""
+    if isinstance(exc, sqlite3.IntegrityError):
+        return True
+    try:
+        import psycopg
+    except ImportError:
+        return False
+    return isinstance(exc, psycopg.IntegrityError)
+
+
+class ConnectionPool:
+    """Thread-safe pool of ``CompatConnection`` objects for either backend.
+
+    Connections idle for longer than ``health_check_interval`` are probed
+    with ``SELECT 1`` before being handed out; connections idle for longer
+    than ``idle_timeout`` are closed while the pool stays above ``min_size``.
+    """
+
+    def __init__(
+        self,
+        settings: DatabaseSettings,
+        pool_settings: PoolSettings | None = None,
+        connect: Callable[[DatabaseSettings], CompatConnection] = connect_database,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.settings = settings
+        self.pool_settings = pool_settings or PoolSettings()
+        self.backend = settings.backend
+        self._connect = connect
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._idle: deque[tuple[CompatConnection, float]] = deque()
+        self._size = 0
+        self._closed = False
+        for _ in range(self.pool_settings.min_size):
+            self._size += 1
+            self._idle.append((self._open(), self._clock()))
+
+    def _open(self) -> CompatConnection:
+        try:
+            return self._connect(self.settings)
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def _close_connection(self, connection: CompatConnection):
+        self._size -= 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_healthy(connection: CompatConnection) -> bool:
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+        except Exception:
+            return False
+        return True
+
+    def _reap_idle(self, now: float):
+        idle_timeout = self.pool_settings.idle_timeout
+        while (
+            self._idle
+            and self._size > self.pool_settings.min_size
+            and now - self._idle[0][1] > idle_timeout
+        ):
+            connection, _ = self._idle.popleft()
+            self._close_connection(connection)
+
+    def _wait_for_slot(self, deadline: float, timeout: float):
+        """Pop an idle connection, or reserve a slot for a new one (returns None)."""
+        while True:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed.")
+            now = self._clock()
+            self._reap_idle(now)
+            if self._idle:
+                # Most recently used first: it is the least likely to be stale
+                return self._idle.pop()
+            if self._size < self.pool_settings.max_size:
+                self._size += 1
+                return None
+            remaining = deadline - now
+            if remaining <= 0:
+                raise PoolTimeout(
+                    f"No database connection available within {timeout} seconds."
+                )
+            self._condition.wait(remaining)
+
+    def getconn(self, timeout: float | None = None) -> CompatConnection:
+        timeout = self.pool_settings.acquire_timeout if timeout is None else timeout
+        deadline = self._clock() + timeout
+        while True:
+            with self._condition:
+                idle_entry = self._wait_for_slot(deadline, timeout)
+            if idle_entry is None:
+                return self._open()
+            connection, last_used = idle_entry
+            if (
+                self._clock() - last_used <= self.pool_settings.health_check_interval
+                or self._is_healthy(connection)
+            ):
+                return connection
+            with self._condition:
+                self._close_connection(connection)
+                self._condition.notify()
+
+    def putconn(self, connection: CompatConnection, discard: bool = False, check: bool = False):
+        if check and not discard:
+            # A failed query may have broken the connection; keep it only if it still answers
+            discard = not self._is_healthy(connection)
+        with self._condition:
+            if discard or self._closed:
+                self._close_connection(connection)
+            else:
+                self._idle.append((connection, self._clock()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout: float | None = None) -> Iterator[CompatConnection]:
+        connection = self.getconn(timeout)
+        try:
+            yield connection
+        except Exception:
+            self.putconn(connection, check=True)
+            raise
+        self.putconn(connection)
+
+    @contextmanager
+    def cursor(self, timeout: float | None = None) -> Iterator[CompatCursor]:
+        with self.connection(timeout) as connection:
+            cursor = connection.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                connection, _ = self._idle.popleft()
+                self._close_connection(connection)
+            self._condition.notify_all()
+
+    def trim(self):
+        """Close idle connections above ``min_size`` now rather than after ``idle_timeout``."""
+        with self._condition:
+            while self._idle and self._size > self.pool_settings.min_size:
+                connection, _ = self._idle.popleft()
+                self._close_connection(connection)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.pool_settings.max_size,
+            }
+
+
+class AsyncCompatCursor:
+    """Async counterpart of ``CompatCursor`` for native async drivers."""
+
+    def __init__(self, raw_cursor: Any, backend: str):
+        self._raw_cursor = raw_cursor
+        self._backend = backend
+
+    async def execute(
+        self,
+        query: str,
+        params: Iterable[Any] | None = None,
+        prepare: bool | None = None,
+    ):
+        adapted_query = _adapt_query(query, self._backend)
+        options = _execute_options(self._backend, prepare)
+        if params is None:
+            await self._raw_cursor.execute(adapted_query, **options)
+        else:
+            await self._raw_cursor.execute(adapted_query, tuple(params), **options)
+        return self
+
+    async def executemany(self, query: str, seq_of_params: Iterable[Iterable[Any]]):
+        adapted_query = _adapt_query(query, self._backend)
+        await self._raw_cursor.executemany(adapted_query, seq_of_params)
+        return self
+
+    async def fetchone(self):
+        return await self._raw_cursor.fetchone()
+
+    async def fetchall(self):
+        return await self._raw_cursor.fetchall()
+
+    async def close(self):
+        result = self._raw_cursor.close()
+        if inspect.isawaitable(result):
+            await result
+
+
+class AsyncCompatConnection:
+    def __init__(self, raw_connection: Any, backend: str):
+        self._raw_connection = raw_connection
+        self.backend = backend
+
+    def cursor(self):
+        return AsyncCompatCursor(self._raw_connection.cursor(), backend=self.backend)
+
+    async def close(self):
+        result = self._raw_connection.close()
+        if inspect.isawaitable(result):
+            await result
+
+
+class ThreadedAsyncCursor:
+    """Async facade over a blocking ``CompatCursor``; every call runs in ``executor``."""
+
+    def __init__(self, cursor: CompatCursor, executor: ThreadPoolExecutor):
+        self._cursor = cursor
+        self._executor = executor
+
+    async def _run(self, function: Callable, *args: Any):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(function, *args))
+
+    async def execute(
+        self,
+        query: str,
+        params: Iterable[Any] | None = None,
+        prepare: bool | None = None,
+    ):
+        await self._run(self._cursor.execute, query, params, prepare)
+        return self
+
+    async def executemany(self, query: str, seq_of_params: Iterable[Iterable[Any]]):
+        await self._run(self._cursor.executemany, query, list(seq_of_params))
+        return self
+
+    async def fetchone(self):
+        return await self._run(self._cursor.fetchone)
+
+    async def fetchall(self):
+        return await self._run(self._cursor.fetchall)
+
+    async def close(self):
+        await self._run(self._cursor.close)
+
+
+async def connect_database_async(settings: DatabaseSettings) -> AsyncCompatConnection:
+    if settings.backend != "postgresql":
+        raise ValueError(
+            f"No async driver for backend {settings.backend}; use ThreadedAsyncPool."
         )
+    try:
+        import psycopg
+    except ImportError as exc:
+        raise RuntimeError(
+            "PostgreSQL backend requested, but psycopg is not installed. "
+            "Install project dependencies, including psycopg[binary]."
+        ) from exc
+
+    raw_connection = await psycopg.AsyncConnection.connect(settings.dsn, autocommit=True)
+    return AsyncCompatConnection(raw_connection, backend="postgresql")
+
+
+class AsyncConnectionPool:
+    """Asyncio pool of ``AsyncCompatConnection`` objects (psycopg ``AsyncConnection``).
+
+    Mirrors ``ConnectionPool``: same size limits, idle reaping and health
+    checks, but waiting for a free connection never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        settings: DatabaseSettings,
+        pool_settings: PoolSettings | None = None,
+        connect: Callable[[DatabaseSettings], Awaitable[AsyncCompatConnection]] = connect_database_async,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.settings = settings
+        self.pool_settings = pool_settings or PoolSettings()
+        self.backend = settings.backend
+        self._connect = connect
+        self._clock = clock
+        self._condition: asyncio.Condition | None = None
+        self._idle: deque[tuple[AsyncCompatConnection, float]] = deque()
+        self._size = 0
+        self._closed = False
+
+    @property
+    def _lock(self) -> asyncio.Condition:
+        # Created lazily so the pool can be built before the event loop starts
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def _open(self) -> AsyncCompatConnection:
+        try:
+            return await self._connect(self.settings)
+        except Exception:
+            async with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+
+    async def _close_connection(self, connection: AsyncCompatConnection):
+        self._size -= 1
+        try:
+            await connection.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    async def _is_healthy(connection: AsyncCompatConnection) -> bool:
+        try:
+            cursor = connection.cursor()
+            try:
+                await cursor.execute("SELECT 1")
+                await cursor.fetchone()
+            finally:
+                await cursor.close()
+        except Exception:
+            return False
+        return True
+
+    async def _reap_idle(self, now: float):
+        while (
+            self._idle
+            and self._size > self.pool_settings.min_size
+            and now - self._idle[0][1] > self.pool_settings.idle_timeout
+        ):
+            connection, _ = self._idle.popleft()
+            await self._close_connection(connection)
+
+    async def _wait_for_slot(self, deadline: float, timeout: float):
+        while True:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed.")
+            now = self._clock()
+            await self._reap_idle(now)
+            if self._idle:
+                return self._idle.pop()
+            if self._size < self.pool_settings.max_size:
+                self._size += 1
+                return None
+            remaining = deadline - now
+            if remaining <= 0:
+                raise PoolTimeout(
+                    f"No database connection available within {timeout} seconds."
+                )
+            try:
+                await asyncio.wait_for(self._lock.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def getconn(self, timeout: float | None = None) -> AsyncCompatConnection:
+        timeout = self.pool_settings.acquire_timeout if timeout is None else timeout
+        deadline = self._clock() + timeout
+        while True:
+            async with self._lock:
+                idle_entry = await self._wait_for_slot(deadline, timeout)
+            if idle_entry is None:
+                return await self._open()
+            connection, last_used = idle_entry
+            if (
+                self._clock() - last_used <= self.pool_settings.health_check_interval
+                or await self._is_healthy(connection)
+            ):
+                return connection
+            async with self._lock:
+                await self._close_connection(connection)
+                self._lock.notify()
+
+    async def putconn(
+        self, connection: AsyncCompatConnection, discard: bool = False, check: bool = False
+    ):
+        if check and not discard:
+            discard = not await self._is_healthy(connection)
+        async with self._lock:
+            if discard or self._closed:
+                await self._close_connection(connection)
+            else:
+                self._idle.append((connection, self._clock()))
+            self._lock.notify()
+
+    @asynccontextmanager
+    async def connection(self, timeout: float | None = None) -> AsyncIterator[AsyncCompatConnection]:
+        connection = await self.getconn(timeout)
+        try:
+            yield connection
+        except Exception:
+            await self.putconn(connection, check=True)
+            raise
+        await self.putconn(connection)
+
+    @asynccontextmanager
+    async def cursor(self, timeout: float | None = None) -> AsyncIterator[AsyncCompatCursor]:
+        async with self.connection(timeout) as connection:
+            cursor = connection.cursor()
+            try:
+                yield cursor
+            finally:
+                await cursor.close()
+
+    async def close(self):
+        async with self._lock:
+            self._closed = True
+            while self._idle:
+                connection, _ = self._idle.popleft()
+                await self._close_connection(connection)
+            self._lock.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "size": self._size,
+            "idle": len(self._idle),
+            "in_use": self._size - len(self._idle),
+            "max_size": self.pool_settings.max_size,
+        }
+
+
+class ThreadedAsyncPool:
+    """Async access to a blocking ``ConnectionPool`` through a bounded thread pool.
+
+    Used for SQLite, which has no async driver: queries run in at most
+    ``max_workers`` threads, so the event loop keeps serving other requests.
+    Cursor sessions are admitted by a semaphore of the same size before a
+    connection is requested, so every executor thread always belongs to a
+    coroutine that can finish its session: a thread blocked in
+    ``getconn`` can never starve the holders that would release connections.
+    """
+
+    def __init__(self, pool: ConnectionPool, max_workers: int | None = None):
+        self.pool = pool
+        self.backend = pool.backend
+        self.max_workers = max_workers or pool.pool_settings.max_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="db",
+        )
+        self._sessions: asyncio.Semaphore | None = None
+
+    async def _run(self, function: Callable, *args: Any):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(function, *args))
+
+    @asynccontextmanager
+    async def cursor(self, timeout: float | None = None) -> AsyncIterator[ThreadedAsyncCursor]:
+        timeout = self.pool.pool_settings.acquire_timeout if timeout is None else timeout
+        if self._sessions is None:
+            self._sessions = asyncio.Semaphore(self.max_workers)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._sessions.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(
+                f"No database connection available within {timeout} seconds."
+            ) from None
+        try:
+            remaining = max(timeout - (time.monotonic() - started), 0.0)
+            connection = await self._run(self.pool.getconn, remaining)
+            try:
+                cursor = ThreadedAsyncCursor(connection.cursor(), self._executor)
+                try:
+                    yield cursor
+                finally:
+                    await cursor.close()
+            except BaseException:
+                await self._run(partial(self.pool.putconn, connection, check=True))
+                raise
+            self.pool.putconn(connection)
+        finally:
+            self._sessions.release()
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        return self.pool.stats()
+
+
+def create_async_pool(
+    settings: DatabaseSettings,
+    pool: ConnectionPool,
+    pool_settings: PoolSettings | None = None,
+):
+    """Pick the async database layer for the backend: native for PostgreSQL, threads for SQLite."""
+    if settings.backend == "postgresql":
+        return AsyncConnectionPool(settings, pool_settings or pool.pool_settings)
+    return ThreadedAsyncPool(pool)
+
+
+SCHEMA_VERSION_TABLE = "schema_version"
+# Arbitrary application-wide key for pg_advisory_xact_lock
+MIGRATION_LOCK_ID = 7_301_001
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One schema step: SQL per backend, optionally followed by a Python data step."""
+
+    version: int
+    description: str
+    statements: Mapping[str, tuple[str, ...]]
+    run: Callable[[CompatCursor, str], Any] | None = None
+
+    def statements_for(self, backend: str) -> tuple[str, ...]:
+        return self.statements.get(backend, ())
+
+
+def _column_exists(cursor: CompatCursor, backend: str, table: str, column: str) -> bool:
+    if backend == "postgresql":
         cursor.execute(
             """
-            CREATE TABLE IF NOT EXISTS tutorial_progress (
-                user_id BIGINT NOT NULL,
-                tutorial_slug TEXT NOT NULL,
-                completed_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY(user_id, tutorial_slug)
-            )
-            """
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = ? AND column_name = ?
+            """,
+            (table, column),
         )
-        return
+        return cursor.fetchone() is not None
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
 
+
+def backfill_tel_normalized(cursor: CompatCursor) -> int:
+    """Fill ``users.tel_normalized`` for rows that do not have it yet.
+
+    Numbers that cannot be normalized, and later duplicates of a number
+    already claimed by another account, are left NULL so the unique index
+    can still be built.
+    """
+    cursor.execute("SELECT id, tel FROM users WHERE tel_normalized IS NULL ORDER BY id")
+    pending = cursor.fetchall()
+    if not pending:
+        return 0
+    cursor.execute("SELECT tel_normalized FROM users WHERE tel_normalized IS NOT NULL")
+    claimed = {row[0] for row in cursor.fetchall()}
+    updates = []
+    for user_id, tel in pending:
+        normalized = normalize_phone_digits(tel)
+        if not normalized or normalized in claimed:
+            continue
+        claimed.add(normalized)
+        updates.append((normalized, user_id))
+    if updates:
+        cursor.executemany("UPDATE users SET tel_normalized = ? WHERE id = ?", updates)
+    return len(updates)
+
+
+def ensure_tel_normalized(cursor: CompatCursor, backend: str):
+    """Add the indexed ``tel_normalized`` lookup column and backfill it."""
+    if not _column_exists(cursor, backend, "users", "tel_normalized"):
+        cursor.execute("ALTER TABLE users ADD COLUMN tel_normalized TEXT")
+    backfill_tel_normalized(cursor)
     cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tel TEXT NOT NULL UNIQUE,
-            name TEXT NOT NULL,
-            pass TEXT NOT NULL,
-            admin INTEGER DEFAULT 0
-        )
-        """
+        "CREATE UNIQUE INDEX IF NOT EXISTS users_tel_normalized_idx "
+        "ON users (tel_normalized)"
     )
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(
+        version=1,
+        description="create users and tutorial_progress",
+        statements={
+            "postgresql": (
+                """
+                CREATE TABLE IF NOT EXISTS users (
+                    id BIGSERIAL PRIMARY KEY,
+                    tel TEXT NOT NULL UNIQUE,
+                    name TEXT NOT NULL,
+                    pass TEXT NOT NULL,
+                    admin INTEGER DEFAULT 0
+                )
+                """,
+                """
+                CREATE TABLE IF NOT EXISTS tutorial_progress (
+                    user_id BIGINT NOT NULL,
+                    tutorial_slug TEXT NOT NULL,
+                    completed_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY(user_id, tutorial_slug)
+                )
+                """,
+            ),
+            "sqlite": (
+                """
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tel TEXT NOT NULL UNIQUE,
+                    name TEXT NOT NULL,
+                    pass TEXT NOT NULL,
+                    admin INTEGER DEFAULT 0
+                )
+                """,
+                """
+                CREATE TABLE IF NOT EXISTS tutorial_progress (
+                    user_id INTEGER NOT NULL,
+                    tutorial_slug TEXT NOT NULL,
+                    completed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY(user_id, tutorial_slug)
+                )
+                """,
+            ),
+        },
+    ),
+    Migration(
+        version=2,
+        description="add indexed users.tel_normalized",
+        statements={},
+        run=ensure_tel_normalized,
+    ),
+)
+
+
+def _table_exists(cursor: CompatCursor, backend: str, table: str) -> bool:
+    if backend == "postgresql":
+        cursor.execute("SELECT to_regclass(?)", (table,))
+        row = cursor.fetchone()
+        return bool(row and row[0])
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def _ensure_schema_version_table(cursor: CompatCursor, backend: str):
+    applied_at_type = "TIMESTAMPTZ" if backend == "postgresql" else "TEXT"
     cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS tutorial_progress (
-            user_id INTEGER NOT NULL,
-            tutorial_slug TEXT NOT NULL,
-            completed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY(user_id, tutorial_slug)
+        f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at {applied_at_type} NOT NULL DEFAULT CURRENT_TIMESTAMP
         )
         """
     )
+
+
+def applied_schema_versions(cursor: CompatCursor, backend: str) -> set[int]:
+    if not _table_exists(cursor, backend, SCHEMA_VERSION_TABLE):
+        return set()
+    cursor.execute(f"SELECT version FROM {SCHEMA_VERSION_TABLE}")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending_migrations(
+    cursor: CompatCursor,
+    backend: str,
+    migrations: Iterable[Migration] = MIGRATIONS,
+) -> list[Migration]:
+    applied = applied_schema_versions(cursor, backend)
+    return sorted(
+        (migration for migration in migrations if migration.version not in applied),
+        key=lambda migration: migration.version,
+    )
+
+
+def _apply_migration(cursor: CompatCursor, backend: str, migration: Migration) -> bool:
+    # Each migration runs in its own transaction; concurrent workers wait on
+    # the write lock and then skip versions that another worker has applied.
+    cursor.execute("BEGIN IMMEDIATE" if backend == "sqlite" else "BEGIN")
+    try:
+        if backend == "postgresql":
+            cursor.execute("SELECT pg_advisory_xact_lock(?)", (MIGRATION_LOCK_ID,))
+        cursor.execute(
+            f"SELECT 1 FROM {SCHEMA_VERSION_TABLE} WHERE version = ?",
+            (migration.version,),
+        )
+        if cursor.fetchone():
+            cursor.execute("ROLLBACK")
+            return False
+        for statement in migration.statements_for(backend):
+            cursor.execute(statement)
+        if migration.run is not None:
+            migration.run(cursor, backend)
+        cursor.execute(
+            f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description) VALUES (?, ?)",
+            (migration.version, migration.description),
+        )
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    cursor.execute("COMMIT")
+    return True
+
+
+def apply_migrations(
+    cursor: CompatCursor,
+    backend: str,
+    migrations: Iterable[Migration] = MIGRATIONS,
+    dry_run: bool = False,
+) -> list[Migration]:
+    """Apply pending migrations in version order and return them.
+
+    With ``dry_run`` nothing is written, not even the ``schema_version``
+    table; the pending migrations are only reported.
+    """
+    migrations = tuple(migrations)
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError("Migration versions must be unique.")
+
+    pending = pending_migrations(cursor, backend, migrations)
+    if dry_run:
+        return pending
+    _ensure_schema_version_table(cursor, backend)
+    return [
+        migration
+        for migration in pending
+        if _apply_migration(cursor, backend, migration)
+    ]
+
+
+def initialize_schema(cursor: CompatCursor, backend: str):
+    return apply_migrations(cursor, backend)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Database schema tools.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate = subcommands.add_parser("migrate", help="apply pending schema migrations")
+    migrate.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only list the migrations that would be applied",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        settings = load_database_settings()
+        connection = connect_database(settings)
+        try:
+            cursor = connection.cursor()
+            migrations = apply_migrations(cursor, settings.backend, dry_run=args.dry_run)
+        finally:
+            connection.close()
+        verb = "Pending" if args.dry_run else "Applied"
+        for migration in migrations:
+            print(f"{verb}: {migration.version:04d} {migration.description}")
+        print(f"{verb} migrations: {len(migrations)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Iterable, Mapping
+
+from jinja2 import Environment, nodes
+
+DEFAULT_PAGE_CACHE_MAX_AGE = 0
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+FINGERPRINT_QUERY_ARG = "v"
+
+
+def parse_max_age(raw_value: str | None, default: int = DEFAULT_PAGE_CACHE_MAX_AGE) -> int:
+    value = (raw_value or "").strip()
+    if not value:
+        return default
+    try:
+        return max(int(value), 0)
+    except ValueError as exc:
+        raise ValueError("Cache max-age must be an integer number of seconds.") from exc
+
+
+def make_etag(*parts: object) -> str:
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def templates_digest(env: Environment, template_names: Iterable[str]) -> str:
+    """Hash template sources so every worker derives the same page ETags."""
+    digest = hashlib.sha1()
+    for template_name in template_names:
+        source, _, _ = env.loader.get_source(env, template_name)
+        digest.update(template_name.encode("utf-8"))
+        digest.update(source.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def static_url_arguments(env: Environment, template_names: Iterable[str]) -> list[str]:
+    """Collect literal ``static_url('...')`` arguments used by the templates."""
+    paths = []
+    for template_name in template_names:
+        source, _, _ = env.loader.get_source(env, template_name)
+        for call in env.parse(source).find_all(nodes.Call):
+            if not isinstance(call.node, nodes.Name) or call.node.name != "static_url":
+                continue
+            if call.args and isinstance(call.args[0], nodes.Const):
+                paths.append(str(call.args[0].value))
+    return paths
+
+
+def format_http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison, as required for If-None-Match."""
+    if not if_none_match:
+        return False
+    value = if_none_match.strip()
+    if value == "*":
+        return True
+    bare_etag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in value.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare_etag:
+            return True
+    return False
+
+
+def not_modified_since(if_modified_since: str | None, last_modified: float) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return False
+    return int(last_modified) <= int(since)
+
+
+def is_not_modified(headers, etag: str | None = None, last_modified: float | None = None) -> bool:
+    """Evaluate conditional request headers; If-None-Match wins when present."""
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match and etag:
+        return etag_matches(if_none_match, etag)
+    if last_modified is not None:
+        return not_modified_since(headers.get("If-Modified-Since"), last_modified)
+    return False
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def file_digest(path: str, chunk_size: int = 64 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class AssetFingerprints:
+    """Content-hash fingerprints for static URLs.
+
+    ``url_roots`` maps public URL prefixes to directories on disk, e.g.
+    ``{"/static/": "static"}``. Hashes are recomputed only when the file's
+    mtime or size changes, and files are re-stat'ed at most once per
+    ``refresh_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        url_roots: Mapping[str, str],
+        refresh_interval: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.url_roots = dict(url_roots)
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._digests: dict[str, tuple[float, tuple[int, int], str]] = {}
+
+    def digest(self, path: str) -> str | None:
+        now = self._clock()
+        cached = self._digests.get(path)
+        if cached is not None and now < cached[0]:
+            return cached[2]
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            self._digests.pop(path, None)
+            return None
+        signature = (stat_result.st_mtime_ns, stat_result.st_size)
+        if cached is not None and cached[1] == signature:
+            file_hash = cached[2]
+        else:
+            file_hash = file_digest(path)
+        self._digests[path] = (now + self.refresh_interval, signature, file_hash)
+        return file_hash
+
+    def url(self, public_path: str) -> str:
+        for prefix, root in self.url_roots.items():
+            if public_path.startswith(prefix):
+                relative_path = public_path[len(prefix):]
+                file_hash = self.digest(os.path.join(root, relative_path))
+                if file_hash:
+                    return f"{public_path}?{FINGERPRINT_QUERY_ARG}={file_hash}"
+                break
+        return public_path
+
+    def matches(self, path: str, fingerprint: str | None) -> bool:
+        return bool(fingerprint) and self.digest(path) == fingerprint
+
+    def version(self, public_paths: Iterable[str]) -> str:
+        """Digest of the fingerprints of ``public_paths``, for page ETags.
+
+        Only a fixed set of paths goes in: fingerprints handed out while
+        serving requests differ between worker processes, and so would the
+        ETags built from them.
+        """
+        digest = hashlib.sha1()
+        for public_path in sorted(set(public_paths)):
+            digest.update(f"{self.url(public_path)};".encode("utf-8"))
+        return digest.hexdigest()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator
+
+from http_cache import etag_matches, format_http_date
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def _byte_position(value: str) -> int | None:
+    value = value.strip()
+    if not (value.isascii() and value.isdigit()):
+        return None
+    return int(value)
+
+
+def parse_range_header(range_header: str | None, file_size: int):
+    """Parse a single ``bytes=`` range into an inclusive ``(start, end)`` pair.
+
+    Returns ``None`` when the header should be ignored and the whole file
+    sent (missing, another unit, several ranges or an invalid range such
+    as ``bytes=5-3``, see RFC 7233 section 3.1) and raises
+    ``RangeNotSatisfiable`` when a valid range lies outside the file.
+    """
+    if not range_header:
+        return None
+    unit, _, ranges = range_header.strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_str, separator, end_str = ranges.strip().partition("-")
+    if not separator:
+        return None
+    start = _byte_position(start_str)
+    end = _byte_position(end_str)
+
+    if not start_str.strip():
+        # Suffix range: the last N bytes of the file
+        if end is None:
+            return None
+        if end == 0:
+            raise RangeNotSatisfiable("Empty suffix range")
+        if file_size == 0:
+            raise RangeNotSatisfiable("Empty file")
+        return max(file_size - end, 0), file_size - 1
+
+    if start is None or (end_str.strip() and (end is None or end < start)):
+        return None
+    if start >= file_size:
+        raise RangeNotSatisfiable("Range starts past the end of the file")
+    if end is None or end >= file_size:
+        end = file_size - 1
+    return start, end
+
+
+def if_range_allows(if_range: str | None, etag: str, last_modified: float) -> bool:
+    """Check ``If-Range``: honour the Range only if the representation is unchanged."""
+    if not if_range:
+        return True
+    value = if_range.strip()
+    if value.startswith("W/"):
+        return False
+    if value.startswith('"'):
+        return etag_matches(value, etag)
+    return value == format_http_date(last_modified)
+
+
+async def iter_file_range(
+    path: str,
+    start: int,
+    length: int,
+    chunk_size: int = RANGE_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Stream ``length`` bytes from ``start`` with at most one chunk in memory."""
+    with open(path, "rb") as source:
+        source.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = source.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+            # Let other requests run between chunks of a large video
+            await asyncio.sleep(0)
@@ -1,30 +1,117 @@
 import microdot.jinja
+import asyncio
+import atexit
 import os
 from microdot import Microdot, Response, send_file, redirect
 from microdot.session import Session, with_session
-from jinja2 import Environment, PackageLoader, select_autoescape
 import base64
 import hashlib
+import hmac
+import time
 import bcrypt
 import json
 import mimetypes
 import jwt
 from urllib.parse import unquote, urlencode
 from datetime import datetime, timezone
-from db_backend import connect_database, initialize_schema, load_database_settings, redact_dsn
+from dataclasses import replace
+from http_cache import (
+    FINGERPRINT_QUERY_ARG,
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    AssetFingerprints,
+    file_etag,
+    format_http_date,
+    is_not_modified,
+    make_etag,
+    parse_max_age,
+    static_url_arguments,
+    templates_digest,
+)
+from bug_reports import (
+    BugReportQueue,
+    BugReportStore,
+    import_legacy_reports,
+    load_bug_report_settings,
+)
+from caching import LRUCache, parse_cache_entries, parse_cache_ttl
+from compression import (
+    install_response_compression,
+    is_compressible,
+    load_compression_settings,
+    negotiated_etag,
+    select_precompressed,
+)
+from http_ranges import (
+    RANGE_CHUNK_SIZE,
+    RangeNotSatisfiable,
+    if_range_allows,
+    iter_file_range,
+    parse_range_header,
+)
+from db_backend import (
+    ConnectionPool,
+    apply_migrations,
+    create_async_pool,
+    is_integrity_error,
+    load_database_settings,
+    load_pool_settings,
+    query_cache_stats,
+    redact_dsn,
+)
+from phone_numbers import (
+    format_phone_number,
+    is_valid_phone_number,
+    normalize_phone_digits,
+    phone_numbers_equal,
+)
 from progress_metrics import (
     build_personal_account_progress as calculate_personal_account_progress,
     format_module_count,
 )
+from progress_writer import ProgressWriteBehind, load_progress_writer_settings
+from render_cache import FragmentCache, parse_cache_bytes
+from template_cache import (
+    CatalogTemplateCache,
+    create_template_environment,
+    load_bytecode_cache_dir,
+    load_template_settings,
+)
+from tutorial_catalog import (
+    DIFFICULTY_LEVELS,
+    TutorialCatalog,
+    build_courses,
+    normalize_tutorial_slug,
+    parse_refresh_interval,
+)
 
 DB_SETTINGS = load_database_settings()
-db = connect_database(DB_SETTINGS)
-cur = db.cursor()
+# Каждый запрос берёт своё соединение из пула вместо общего курсора.
+# Обработчики ходят в пул только через db_async: блокирующий getconn в event loop
+# остановил бы и те корутины, которые должны вернуть соединения
+DB_POOL_SETTINGS = load_pool_settings()
+# Для PostgreSQL запросы обслуживает свой пул db_async, а синхронный нужен только
+# для миграций и дозаписи очередей при остановке: держим в нём одно соединение
+db_pool = ConnectionPool(
+    DB_SETTINGS,
+    replace(DB_POOL_SETTINGS, min_size=0, max_size=1)
+    if DB_SETTINGS.backend == "postgresql"
+    else DB_POOL_SETTINGS,
+)
+# Горячие запросы не блокируют event loop: psycopg AsyncConnection или потоки для SQLite
+db_async = create_async_pool(DB_SETTINGS, db_pool, DB_POOL_SETTINGS)
+if os.name == "nt" and DB_SETTINGS.backend == "postgresql":
+    # psycopg AsyncConnection не работает с ProactorEventLoop
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 print(f"Using database backend: {DB_SETTINGS.backend} ({redact_dsn(DB_SETTINGS.dsn)})")
 
 # todo: rate limiting на post запросы
 
-env = Environment(loader=PackageLoader("main"), autoescape=select_autoescape())
+TEMPLATE_SETTINGS = load_template_settings()
+# Скомпилированные шаблоны кэшируются на диске и общие для всех воркеров
+env = create_template_environment(load_bytecode_cache_dir(), TEMPLATE_SETTINGS)
+asset_fingerprints = AssetFingerprints({"/static/": "static", "/assets/": "assets"})
+env.globals["static_url"] = asset_fingerprints.url
 
 page_index = env.get_template("index.tmpl")
 page_login = env.get_template("login.tmpl")
@@ -36,20 +123,26 @@ page_personal_account = env.get_template("personal_account.tmpl")
 page_forgot = env.get_template("forgot.tmpl")
 page_tutorial_viewer = env.get_template("tutorial_viewer.tmpl")
 page_support = env.get_template("support.tmpl")
+PAGE_TEMPLATE_NAMES = (
+    "index.tmpl",
+    "tutorial.tmpl",
+    "tutorial_course.tmpl",
+    "support.tmpl",
+    "topbar.tmpl",
+)
+PAGE_TEMPLATES_DIGEST = templates_digest(env, PAGE_TEMPLATE_NAMES)
+PAGE_TEMPLATE_FILES = [name for name in env.list_templates() if "/" not in name]
+# ETag страниц учитывает только ассеты из шаблонов, одинаковые во всех воркерах
+PAGE_ASSET_URLS = tuple(static_url_arguments(env, PAGE_TEMPLATE_FILES))
+PAGE_CACHE_MAX_AGE = parse_max_age(os.environ.get("PAGE_CACHE_MAX_AGE"))
+APP_STARTED_AT = time.time()
 TUTORIALS_DIR = os.path.join("templates", "tutorials")
-TUTORIAL_PAGE_EXTENSIONS = (".tmpl", ".html", ".htm")
-BUGREPORTS_FILE = os.path.join(os.path.dirname(__file__), "bugreports.json")
 PROGRESS_COOKIE_NAME = "guest_tutorial_progress"
 PROGRESS_COOKIE_MAX_AGE = 60 * 60 * 24 * 365
-DIFFICULTY_LEVELS = ("basic", "advanced")
 DIFFICULTY_LABELS = {
     "basic": "Базовый",
     "advanced": "Расширенный",
 }
-TUTORIAL_SLUG_RENAMES = {
-    "rustoredowload": "rustoredownload",
-}
-DEFAULT_COURSE_SLUG = "smartphone-basics"
 COURSE_DEFINITIONS = [
     {
         "slug": "smartphone-basics",
@@ -109,8 +202,39 @@ SUPPORT_FEEDBACK_LABELS = {
     "resolved": "Всё получилось",
     "issues": "Возникли проблемы",
 }
+SUPPORT_QUEUE_FULL_MESSAGE = "Сейчас слишком много обращений. Попробуйте снова через несколько секунд."
+SUPPORT_RETRY_AFTER_SECONDS = 5
+SUPPORT_STATS_DEFAULT_DAYS = 30
+SUPPORT_STATS_MAX_DAYS = 366
+
+tutorial_catalog = TutorialCatalog(
+    TUTORIALS_DIR,
+    refresh_interval=parse_refresh_interval(
+        os.environ.get("TUTORIAL_CATALOG_REFRESH_SECONDS")
+    ),
+    course_definitions=COURSE_DEFINITIONS,
+)
+USER_CACHE_TTL = parse_cache_ttl(os.environ.get("USER_CACHE_TTL_SECONDS"), 60.0)
+USER_CACHE_MAX_ENTRIES = parse_cache_entries(os.environ.get("USER_CACHE_MAX_ENTRIES"), 10000)
+# Строки users по id; сбрасываются при изменении аккаунта, TTL ограничивает рассинхрон между воркерами
+user_cache = LRUCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL)
+# Пройденные модули по id пользователя (frozenset нормализованных slug), write-through
+progress_cache = LRUCache(
+    max_entries=parse_cache_entries(os.environ.get("PROGRESS_CACHE_MAX_ENTRIES"), 10000),
+    ttl=USER_CACHE_TTL,
+)
+tutorial_fragments = FragmentCache(
+    env,
+    max_bytes=parse_cache_bytes(os.environ.get("TUTORIAL_FRAGMENT_CACHE_BYTES")),
+)
+# Без auto_reload Jinja не проверяет файлы шаблонов; кэш сбрасывается по поколению каталога
+catalog_template_cache = CatalogTemplateCache(env, TEMPLATE_SETTINGS, len(PAGE_TEMPLATE_FILES))
 
 app = Microdot()
+# send_file по умолчанию читает файлы кусками по 1 КиБ
+Response.send_file_buffer_size = RANGE_CHUNK_SIZE
+# Сжимаем отрендеренные страницы и JSON прямо в приложении, без nginx
+RESPONSE_COMPRESSION = install_response_compression(app, load_compression_settings())
 
 
 def _ensure_jwt_compat():
@@ -155,147 +279,16 @@ SESSION_SECRET = os.environ.get("SESSION_SECRET", "change-me")
 Session(app, secret_key=SESSION_SECRET)
 
 
-def normalize_tutorial_slug(slug: str):
-    """Normalize tutorial slug to the canonical route."""
-    raw_slug = (slug or "").strip().lower()
-    return TUTORIAL_SLUG_RENAMES.get(raw_slug, raw_slug)
-
-
 def resolve_tutorial_directory(tutorial_slug: str):
     """Map canonical slug to an existing tutorials directory."""
-    normalized_slug = normalize_tutorial_slug(tutorial_slug)
-    if not normalized_slug or not os.path.exists(TUTORIALS_DIR):
+    if not normalize_tutorial_slug(tutorial_slug):
         return None
-
-    for directory_name in sorted(os.listdir(TUTORIALS_DIR)):
-        tutorial_path = os.path.join(TUTORIALS_DIR, directory_name)
-        if not os.path.isdir(tutorial_path):
-            continue
-        if not any(
-            os.path.splitext(filename)[1].lower() in TUTORIAL_PAGE_EXTENSIONS
-            for filename in os.listdir(tutorial_path)
-        ):
-            continue
-        if normalize_tutorial_slug(directory_name) == normalized_slug:
-            return directory_name
-    return None
+    return tutorial_catalog.resolve_directory(tutorial_slug)
 
 
 def load_tutorials(include_hidden=False):
     """Return tutorial metadata for interface and viewer pages."""
-    tutorials = []
-    seen_slugs = set()
-
-    if not os.path.exists(TUTORIALS_DIR):
-        try:
-            os.makedirs(TUTORIALS_DIR, exist_ok=True)
-        except OSError:
-            return tutorials
-
-    for directory_name in sorted(os.listdir(TUTORIALS_DIR)):
-        tutorial_path = os.path.join(TUTORIALS_DIR, directory_name)
-        if not os.path.isdir(tutorial_path):
-            continue
-
-        page_files = [
-            f
-            for f in os.listdir(tutorial_path)
-            if os.path.splitext(f)[1].lower() in TUTORIAL_PAGE_EXTENSIONS
-        ]
-        if not page_files:
-            continue
-
-        slug = normalize_tutorial_slug(directory_name)
-        if slug in seen_slugs:
-            continue
-        seen_slugs.add(slug)
-
-        meta_path = os.path.join(tutorial_path, "meta.json")
-        meta = {}
-
-        if os.path.exists(meta_path):
-            try:
-                with open(meta_path, encoding="utf-8") as meta_file:
-                    meta = json.load(meta_file)
-            except Exception:
-                meta = {}
-
-        level = str(meta.get("level", "basic")).lower()
-        if level not in DIFFICULTY_LEVELS:
-            level = "basic"
-
-        order = meta.get("order")
-        try:
-            order = int(str(order).strip())
-        except (TypeError, ValueError):
-            order = 1000
-
-        visible_in_interface = meta.get("visible_in_interface", True)
-        if isinstance(visible_in_interface, str):
-            visible_in_interface = (
-                visible_in_interface.strip().lower() not in ("0", "false", "no")
-            )
-        else:
-            visible_in_interface = bool(visible_in_interface)
-
-        if not include_hidden and not visible_in_interface:
-            continue
-
-        course = str(meta.get("course", DEFAULT_COURSE_SLUG)).strip() or DEFAULT_COURSE_SLUG
-        viewer_navigation = str(meta.get("viewer_navigation", "pages")).strip().lower()
-        if viewer_navigation not in ("pages", "style-switch"):
-            viewer_navigation = "pages"
-
-        style_options = meta.get("style_options")
-        if not isinstance(style_options, list):
-            style_options = []
-
-        tutorials.append(
-            {
-                "slug": slug,
-                "directory": directory_name,
-                "title": meta.get("title") or slug,
-                "description": meta.get("description") or "Описание появится позже.",
-                "level": level,
-                "course": course,
-                "viewer_navigation": viewer_navigation,
-                "style_options": style_options,
-                "order": order,
-            }
-        )
-
-    return tutorials
-
-
-def _tutorial_sort_key(filename: str):
-    """Sort tutorial pages numerically when possible, otherwise alphabetically."""
-    stem, _ = os.path.splitext(filename)
-    try:
-        return (0, int(stem))
-    except ValueError:
-        return (1, stem.lower())
-
-
-def _tutorial_module_sort_key(tutorial):
-    """Stable sorting for tutorial cards inside courses."""
-    return (
-        int(tutorial.get("order", 1000)),
-        str(tutorial.get("title", "")).casefold(),
-        str(tutorial.get("slug", "")),
-    )
-
-
-def _dedupe_tutorials(tutorials):
-    """Remove duplicate tutorial slugs while preserving order."""
-    seen = set()
-    unique = []
-    for tutorial in tutorials:
-        slug = tutorial.get("slug")
-        if not slug or slug in seen:
-            continue
-        seen.add(slug)
-        unique.append(tutorial)
-    return unique
+    return tutorial_catalog.tutorials(include_hidden=include_hidden)
 
 
 def normalize_difficulty(level: str):
@@ -307,74 +300,96 @@ def normalize_difficulty(level: str):
 
 
 def build_course_catalog(include_hidden=False):
-    """Build course list with grouped tutorials and counts."""
-    tutorials = load_tutorials(include_hidden=include_hidden)
-    courses = []
-    course_map = {}
-
-    for definition in COURSE_DEFINITIONS:
-        course_data = {
-            "slug": definition["slug"],
-            "title": definition["title"],
-            "description": definition["description"],
-            "basic_description": definition.get("basic_description", ""),
-            "advanced_description": definition.get("advanced_description", ""),
-            "basic_modules": [],
-            "advanced_only_modules": [],
-            "advanced_modules": [],
-            "module_count": 0,
-            "basic_count": 0,
-            "advanced_count": 0,
-        }
-        courses.append(course_data)
-        course_map[course_data["slug"]] = course_data
+    """Return the shared read-only course list with grouped tutorials and counts."""
+    if include_hidden:
+        return build_courses(load_tutorials(include_hidden=True), COURSE_DEFINITIONS)
+    return tutorial_catalog.courses()
 
-    for tutorial in tutorials:
-        course_slug = str(tutorial.get("course") or DEFAULT_COURSE_SLUG).strip()
-        course_data = course_map.get(course_slug)
-        if not course_data:
-            continue
 
-        if tutorial.get("level") == "advanced":
-            course_data["advanced_only_modules"].append(tutorial)
-        else:
-            course_data["basic_modules"].append(tutorial)
-
-    for course_data in courses:
-        course_data["basic_modules"].sort(key=_tutorial_module_sort_key)
-        course_data["advanced_only_modules"].sort(key=_tutorial_module_sort_key)
+def get_course_track_modules(course_data, difficulty):
+    """Return linear module list for selected difficulty."""
+    if normalize_difficulty(difficulty) == "advanced":
+        return course_data.get("advanced_modules") or ()
+    return course_data.get("basic_modules") or ()
 
-        combined = _dedupe_tutorials(
-            course_data["basic_modules"] + course_data["advanced_only_modules"]
-        )
-        course_data["advanced_modules"] = combined
-        course_data["module_count"] = len(combined)
-        course_data["basic_count"] = len(course_data["basic_modules"])
-        course_data["advanced_count"] = len(course_data["advanced_modules"])
 
-    return courses
+def get_course_track_index(course_data, difficulty):
+    """Return slug -> position map for the selected difficulty track."""
+    if normalize_difficulty(difficulty) == "advanced":
+        return course_data.get("advanced_index") or {}
+    return course_data.get("basic_index") or {}
 
 
-def get_course_track_modules(course_data, difficulty):
-    """Return linear module list for selected difficulty."""
-    if normalize_difficulty(difficulty) == "advanced":
-        return list(course_data.get("advanced_modules") or [])
-    return list(course_data.get("basic_modules") or [])
+def is_track_module_unlocked(modules, module_idx, completed_slugs):
+    """Check the linear-flow gate for a single module without annotating the track."""
+    if modules[module_idx].get("slug") in completed_slugs:
+        return True
+    return all(module.get("slug") in completed_slugs for module in modules[:module_idx])
 
 
-def get_user_completed_tutorial_slugs(user_id: int):
+async def get_user_completed_tutorial_slugs(user_id: int):
     """Load completed tutorial slugs from DB for logged-in user."""
     if not user_id:
         return set()
-    cur.execute(
-        "SELECT tutorial_slug FROM tutorial_progress WHERE user_id = ?",
-        (user_id,),
+    completed = progress_cache.get(user_id)
+    if completed is None:
+        async with db_async.cursor() as cur:
+            await cur.execute(
+                "SELECT tutorial_slug FROM tutorial_progress WHERE user_id = ?",
+                (user_id,),
+                prepare=True,
+            )
+            rows = await cur.fetchall()
+        completed = frozenset(
+            normalize_tutorial_slug(row[0])
+            for row in rows
+            if row and row[0]
+        )
+        if progress_writer is not None:
+            completed |= progress_writer.pending_slugs(user_id)
+        progress_cache.set(user_id, completed)
+    return set(completed)
+
+
+def invalidate_progress_cache(user_id: int):
+    progress_cache.pop(user_id)
+
+
+PROGRESS_INSERT_QUERY = """
+    INSERT INTO tutorial_progress (user_id, tutorial_slug)
+    VALUES (?, ?)
+    ON CONFLICT(user_id, tutorial_slug) DO NOTHING
+"""
+
+
+async def write_progress_batch(rows):
+    async with db_async.cursor() as cur:
+        await cur.executemany(PROGRESS_INSERT_QUERY, rows)
+
+
+def flush_pending_progress():
+    """Write queued completions synchronously; used once the event loop has stopped."""
+    if progress_writer is None:
+        return
+    rows = progress_writer.take_pending()
+    if not rows:
+        return
+    with db_pool.cursor() as cur:
+        cur.executemany(PROGRESS_INSERT_QUERY, rows)
+    print(f"Flushed {len(rows)} pending tutorial completions")
+
+
+PROGRESS_WRITER_SETTINGS = load_progress_writer_settings()
+progress_writer = (
+    ProgressWriteBehind(
+        write_progress_batch,
+        batch_size=PROGRESS_WRITER_SETTINGS.batch_size,
+        flush_interval=PROGRESS_WRITER_SETTINGS.flush_interval,
     )
-    return {
-        normalize_tutorial_slug(row[0])
-        for row in cur.fetchall()
-        if row and row[0]
-    }
+    if PROGRESS_WRITER_SETTINGS.batched
+    else None
+)
+atexit.register(flush_pending_progress)
 
 
 def _normalize_progress_cookie_items(values):
@@ -406,10 +421,10 @@ def encode_guest_completed_tutorial_slugs(completed_slugs):
     return json.dumps(sorted(completed_slugs), ensure_ascii=False, separators=(",", ":"))
 
 
-def get_completed_tutorial_slugs(request, user):
+async def get_completed_tutorial_slugs(request, user):
     """Return completed tutorial slugs from DB or cookies."""
     if user:
-        return get_user_completed_tutorial_slugs(user[0])
+        return await get_user_completed_tutorial_slugs(user[0])
     return get_guest_completed_tutorial_slugs(request)
 
 
@@ -477,71 +492,44 @@ def build_viewer_query(course_slug="", difficulty=""):
     return "?" + urlencode(params)
 
 
-def build_personal_account_progress(user_id: int):
+async def build_personal_account_progress(user_id: int):
     """Build summary and per-course progress for personal account page."""
-    completed_slugs = get_user_completed_tutorial_slugs(user_id)
+    completed_slugs = await get_user_completed_tutorial_slugs(user_id)
     courses = build_course_catalog()
     return calculate_personal_account_progress(courses, completed_slugs)
 
 
-def normalize_phone_digits(raw_phone: str):
-    """Return normalized Russian phone digits (11 digits with 7-prefix)."""
-    digits = "".join(char for char in str(raw_phone or "") if char.isdigit())
-    if len(digits) == 11 and digits[0] in ("7", "8"):
-        return "7" + digits[1:]
-    if len(digits) == 10:
-        return "7" + digits
-    return ""
-
-
-def is_valid_phone_number(raw_phone: str):
-    """Validate phone number as a Russian mobile-compatible format."""
-    return bool(normalize_phone_digits(raw_phone))
-
-
-def format_phone_number(raw_phone: str):
-    """Format phone to canonical +7 (XXX) XXX-XX-XX representation."""
-    normalized = normalize_phone_digits(raw_phone)
-    if not normalized:
-        return ""
-    return (
-        f"+7 ({normalized[1:4]}) "
-        f"{normalized[4:7]}-{normalized[7:9]}-{normalized[9:11]}"
-    )
-
-
-def phone_numbers_equal(left_phone: str, right_phone: str):
-    """Compare phone numbers by normalized digits (or raw fallback)."""
-    left_normalized = normalize_phone_digits(left_phone)
-    right_normalized = normalize_phone_digits(right_phone)
-    if left_normalized and right_normalized:
-        return left_normalized == right_normalized
-    return str(left_phone or "").strip() == str(right_phone or "").strip()
-
-
-def mark_tutorial_completed(user_id: int, tutorial_slug: str):
+async def mark_tutorial_completed(user_id: int, tutorial_slug: str):
     """Mark tutorial as completed for a user on first visit."""
     if not user_id or not tutorial_slug:
         return
-    cur.execute(
-        """
-        INSERT INTO tutorial_progress (user_id, tutorial_slug)
-        VALUES (?, ?)
-        ON CONFLICT(user_id, tutorial_slug) DO NOTHING
-        """,
-        (user_id, tutorial_slug),
-    )
+    completed = progress_cache.get(user_id, count=False)
+    if completed is not None and tutorial_slug in completed:
+        return
+    if progress_writer is not None:
+        # Режим batched: запись уйдёт в БД пачкой, запрос её не ждёт
+        progress_writer.add(user_id, tutorial_slug)
+    else:
+        async with db_async.cursor() as cur:
+            await cur.execute(PROGRESS_INSERT_QUERY, (user_id, tutorial_slug), prepare=True)
+    # Берём запись заново: пока шёл INSERT, её могли обновить другие запросы
+    completed = progress_cache.get(user_id, count=False)
+    if completed is not None:
+        progress_cache.set(user_id, completed | {tutorial_slug})
 
 
-def get_user_tutorial_progress(user_id: int):
+async def get_user_tutorial_progress(user_id: int):
     """Return tutorial list with completion status for the given user."""
     tutorials = load_tutorials()
-    cur.execute(
-        "SELECT tutorial_slug, completed_at FROM tutorial_progress WHERE user_id = ?",
-        (user_id,),
-    )
+    async with db_async.cursor() as cur:
+        await cur.execute(
+            "SELECT tutorial_slug, completed_at FROM tutorial_progress WHERE user_id = ?",
+            (user_id,),
+            prepare=True,
+        )
+        rows = await cur.fetchall()
     completed_by_slug = {}
-    for row in cur.fetchall():
+    for row in rows:
         normalized_slug = normalize_tutorial_slug(row[0])
         completed_by_slug[normalized_slug] = row[1]
 
@@ -561,56 +549,195 @@ def get_user_tutorial_progress(user_id: int):
     return progress
 
 
-def get_current_user(session):
+async def get_current_user(session):
     user_id = session.get("user_id")
     if not user_id:
         return None
-    cur.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-    return cur.fetchone()
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    async with db_async.cursor() as cur:
+        await cur.execute("SELECT * FROM users WHERE id = ?", (user_id,), prepare=True)
+        user = await cur.fetchone()
+    if user is not None:
+        user_cache.set(user_id, tuple(user))
+    return user
+
+
+def remember_user_name(session, user_name):
+    """Keep the display name in the session along with the time it was read."""
+    session["user_name"] = user_name
+    session["user_name_at"] = time.time()
+
+
+async def get_current_user_name(session):
+    """Display name for pages that only greet the user; taken from the session when possible."""
+    if not session.get("user_id"):
+        return None
+    user_name = session.get("user_name")
+    # Аккаунт могли переименовать или удалить с другого устройства: имя из cookie
+    # используем не дольше USER_CACHE_TTL, потом сверяемся с записью пользователя
+    if user_name and time.time() - session.get("user_name_at", 0) < USER_CACHE_TTL:
+        return user_name
+    user = await get_current_user(session)
+    if user is None:
+        return None
+    remember_user_name(session, user[2])
+    session.save()
+    return user[2]
+
+
+def invalidate_user_cache(user_id: int):
+    user_cache.pop(user_id)
 
 
 def init_db():
-    """Create required application tables if missing."""
-    initialize_schema(cur, DB_SETTINGS.backend)
+    """Apply pending schema migrations (see ``python db_backend.py migrate --dry-run``)."""
+    with db_pool.cursor() as cur:
+        applied = apply_migrations(cur, DB_SETTINGS.backend)
+    for migration in applied:
+        print(f"Applied migration {migration.version:04d}: {migration.description}")
+    # Соединение миграций не держим до выключения (для PostgreSQL min_size = 0)
+    db_pool.trim()
 
 
 # Run the check on startup
 init_db()
+catalog_template_cache.sync(tutorial_catalog.snapshot())
+
+# Обращения дописываются строкой в bugreports.jsonl, файл целиком не перечитывается
+BUG_REPORT_SETTINGS = load_bug_report_settings()
+bug_report_store = BugReportStore.from_settings(BUG_REPORT_SETTINGS)
+# Обработчики только ставят обращение в очередь, на диск его пишет фоновая задача
+bug_report_queue = BugReportQueue.from_settings(bug_report_store, BUG_REPORT_SETTINGS)
+# Повреждённый старый файл не должен мешать запуску; строгий импорт — python bug_reports.py import
+imported_reports = import_legacy_reports(bug_report_store, strict=False)
+if imported_reports:
+    print(f"Imported {imported_reports} reports from bugreports.json into {bug_report_store.path}")
+
+
+def append_bug_report(report_kind: str, report_code: str, label: str, user) -> bool:
+    """Queue a support report; False means the queue is full."""
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "report_kind": report_kind,
+        "report_code": report_code,
+        "label": label,
+        "user": (
+            {
+                "id": user[0],
+                "tel": user[1],
+                "name": user[2],
+            }
+            if user
+            else None
+        ),
+    }
+    return bug_report_queue.submit(report)
+
+
+def flush_pending_bug_reports():
+    """Write queued reports synchronously; used once the event loop has stopped."""
+    reports = bug_report_queue.take_pending()
+    if reports:
+        bug_report_store.append_many(reports)
+        print(f"Flushed {len(reports)} pending support reports")
+
+
+atexit.register(flush_pending_bug_reports)
 
-def _load_bug_reports():
-    if not os.path.exists(BUGREPORTS_FILE):
-        return []
+
+def html_page_response(request, user, render_page, cache_key=(), shared=True):
+    """Render an HTML page; anonymous revalidations get 304 before any rendering."""
+    if user:
+        return (
+            render_page(),
+            200,
+            {"Content-Type": "text/html", "Cache-Control": "private, no-store"},
+        )
+
+    snapshot = tutorial_catalog.snapshot()
+    etag = make_etag(
+        PAGE_TEMPLATES_DIGEST,
+        asset_fingerprints.version(PAGE_ASSET_URLS),
+        snapshot.fingerprint,
+        request.path,
+        request.query_string,
+        *cache_key,
+    )
+    # 304 не сжимается, поэтому ослабляем ETag заранее — как у сжатого 200
+    etag = negotiated_etag(request, etag, "text/html", RESPONSE_COMPRESSION)
+    headers = {
+        "Content-Type": "text/html",
+        "ETag": etag,
+        "Cache-Control": (
+            f"{'public' if shared else 'private'}, "
+            f"max-age={PAGE_CACHE_MAX_AGE}, must-revalidate"
+        ),
+        # После входа по той же ссылке отдаётся личная страница
+        "Vary": "Cookie",
+    }
+    # Last-Modified только для страниц, зависящих лишь от URL и каталога
+    last_modified = None
+    if shared:
+        last_modified = max(APP_STARTED_AT, snapshot.built_at)
+        headers["Last-Modified"] = format_http_date(last_modified)
+    if is_not_modified(request.headers, etag, last_modified):
+        return "", 304, headers
+    return render_page(), 200, headers
+
+
+def send_cached_file(request, file_path, content_type=None):
+    """Send a file with validators; fingerprinted URLs are cached as immutable.
+
+    Text assets are served from precompressed .br/.gz variants when the
+    client accepts them (see ``python compression.py precompress``).
+    """
     try:
-        with open(BUGREPORTS_FILE, encoding="utf-8-sig") as reports_file:
-            data = json.load(reports_file)
-    except (OSError, json.JSONDecodeError):
-        return []
-    if isinstance(data, list):
-        return data
-    return []
-
-
-def append_bug_report(report_kind: str, report_code: str, label: str, user):
-    reports = _load_bug_reports()
-    reports.append(
-        {
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "report_kind": report_kind,
-            "report_code": report_code,
-            "label": label,
-            "user": (
-                {
-                    "id": user[0],
-                    "tel": user[1],
-                    "name": user[2],
-                }
-                if user
-                else None
-            ),
-        }
+        stat_result = os.stat(file_path)
+    except OSError:
+        return "Not found", 404
+    if not os.path.isfile(file_path):
+        return "Not found", 404
+
+    if content_type is None:
+        extension = file_path.rsplit(".", 1)[-1].lower()
+        content_type = Response.types_map.get(extension, "application/octet-stream")
+
+    served_path = file_path
+    content_encoding = None
+    compressible = is_compressible(file_path)
+    if compressible:
+        served_path, content_encoding = select_precompressed(
+            file_path, request.headers.get("Accept-Encoding")
+        )
+
+    etag = file_etag(stat_result)
+    if content_encoding:
+        etag = f'{etag[:-1]}-{content_encoding}"'
+    fingerprint = request.args.get(FINGERPRINT_QUERY_ARG)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_http_date(stat_result.st_mtime),
+        "Cache-Control": (
+            IMMUTABLE_CACHE_CONTROL
+            if asset_fingerprints.matches(file_path, fingerprint)
+            else REVALIDATE_CACHE_CONTROL
+        ),
+    }
+    if compressible:
+        headers["Vary"] = "Accept-Encoding"
+    if is_not_modified(request.headers, etag, stat_result.st_mtime):
+        return "", 304, headers
+
+    response = send_file(
+        served_path,
+        content_type=content_type,
+        compressed=content_encoding or False,
     )
-    with open(BUGREPORTS_FILE, "w", encoding="utf-8") as reports_file:
-        json.dump(reports, reports_file, ensure_ascii=False, indent=2)
+    for name, value in headers.items():
+        response.headers[name] = value
+    return response
 
 
 def _is_support_widget_request(request):
@@ -620,13 +747,18 @@ def _is_support_widget_request(request):
     )
 
 
-def _support_api_response(request, ok: bool, message: str, fallback_url: str):
+def _support_api_response(
+    request, ok: bool, message: str, fallback_url: str, status_code: int | None = None
+):
     if _is_support_widget_request(request):
         body = json.dumps({"ok": ok, "message": message}, ensure_ascii=False)
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        if status_code == 503:
+            headers["Retry-After"] = str(SUPPORT_RETRY_AFTER_SECONDS)
         return (
             body,
-            200 if ok else 400,
-            {"Content-Type": "application/json; charset=utf-8"},
+            status_code or (200 if ok else 400),
+            headers,
         )
     return redirect(fallback_url)
 
@@ -637,7 +769,7 @@ def _support_api_response(request, ok: bool, message: str, fallback_url: str):
 @app.route("/")
 @with_session
 async def index(request, session):
-    user = get_current_user(session)
+    user_name = await get_current_user_name(session)
     alert_message = None
     alert_type = None  # success | error
 
@@ -658,23 +790,22 @@ async def index(request, session):
         alert_type = "error"
         alert_message = "Не удалось войти. Проверьте номер телефона и пароль."
 
-    return (
-        page_index.render(
+    def render_page():
+        return page_index.render(
             alert_message=alert_message,
             alert_type=alert_type,
-            yes_login=bool(user),
-            user_name=user[2] if user else "",
-        ),
-        200,
-        {"Content-Type": "text/html"},
-    )
+            yes_login=bool(user_name),
+            user_name=user_name or "",
+        )
+
+    return html_page_response(request, user_name, render_page)
 
 
 # login
 @app.route("/login")
 @with_session
 async def index(request, session):
-    user = get_current_user(session)
+    user_name = await get_current_user_name(session)
     status = ""
     login_error = ""
     if request.args.get("reset") == "success":
@@ -686,8 +817,8 @@ async def index(request, session):
         page_login.render(
             test=status,
             login_error=login_error,
-            yes_login=bool(user),
-            user_name=user[2] if user else "",
+            yes_login=bool(user_name),
+            user_name=user_name or "",
         ),
         200,
         {"Content-Type": "text/html"},
@@ -698,7 +829,7 @@ async def index(request, session):
 @app.route("/register")
 @with_session
 async def index(request, session):
-    user = get_current_user(session)
+    user_name = await get_current_user_name(session)
     error_code = request.args.get("error") or ""
     error_messages = {
         "blank": "Заполните все поля формы.",
@@ -707,8 +838,8 @@ async def index(request, session):
     }
     return (
         page_register.render(
-            yes_login=bool(user),
-            user_name=user[2] if user else "",
+            yes_login=bool(user_name),
+            user_name=user_name or "",
             reg_error=error_messages.get(error_code, ""),
         ),
         200,
@@ -722,7 +853,7 @@ async def static(request, path):
     decoded_path = unquote(path)
     if ".." in decoded_path or decoded_path.startswith("/") or decoded_path.startswith("\\"):
         return "Not found", 404
-    return send_file("static/" + decoded_path)
+    return send_cached_file(request, "static/" + decoded_path)
 
 
 @app.route("/tutorials-assets/<tutorial_name>/<path:path>")
@@ -741,60 +872,59 @@ async def tutorial_assets(request, tutorial_name, path):
     asset_path = os.path.join(TUTORIALS_DIR, resolved_tutorial_name, decoded_path)
     if not os.path.isfile(asset_path):
         return "Not found", 404
-    # Basic Range support for media files (videos) so seeking works
-    range_header = request.headers.get("Range") or request.headers.get("range")
-    if range_header and range_header.startswith("bytes="):
-        file_size = os.path.getsize(asset_path)
-        bytes_range = range_header.split("=", 1)[1]
-        start_str, end_str = (bytes_range.split("-") + [""])[:2]
-        try:
-            start = int(start_str) if start_str else 0
-            end = int(end_str) if end_str else file_size - 1
-        except ValueError:
-            return "Invalid Range", 400
-        if start >= file_size:
-            return "Range Not Satisfiable", 416
-        end = min(end, file_size - 1)
-        length = end - start + 1
-        with open(asset_path, "rb") as f:
-            f.seek(start)
-            data = f.read(length)
-        mime, _ = mimetypes.guess_type(asset_path)
-        headers = {
-            "Content-Range": f"bytes {start}-{end}/{file_size}",
-            "Accept-Ranges": "bytes",
-            "Content-Length": str(length),
-            "Content-Type": mime or "application/octet-stream",
-        }
-        return data, 206, headers
-
+    # Range support for media files (videos) so seeking works. Ranges are
+    # streamed in bounded chunks instead of being read into memory.
+    range_header = request.headers.get("Range")
     mime, _ = mimetypes.guess_type(asset_path)
-    return send_file(asset_path, content_type=mime or "application/octet-stream")
+    content_type = mime or "application/octet-stream"
+    if range_header:
+        stat_result = os.stat(asset_path)
+        file_size = stat_result.st_size
+        etag = file_etag(stat_result)
+        if if_range_allows(request.headers.get("If-Range"), etag, stat_result.st_mtime):
+            try:
+                byte_range = parse_range_header(range_header, file_size)
+            except RangeNotSatisfiable:
+                return "Range Not Satisfiable", 416, {"Content-Range": f"bytes */{file_size}"}
+            if byte_range:
+                start, end = byte_range
+                length = end - start + 1
+                headers = {
+                    "Content-Range": f"bytes {start}-{end}/{file_size}",
+                    "Accept-Ranges": "bytes",
+                    "Content-Length": str(length),
+                    "Content-Type": content_type,
+                    "ETag": etag,
+                    "Last-Modified": format_http_date(stat_result.st_mtime),
+                    "Cache-Control": REVALIDATE_CACHE_CONTROL,
+                }
+                return Response(
+                    body=iter_file_range(asset_path, start, length),
+                    status_code=206,
+                    headers=headers,
+                )
+
+    response = send_cached_file(request, asset_path, content_type=content_type)
+    if isinstance(response, Response):
+        response.headers["Accept-Ranges"] = "bytes"
+    return response
 
 
 # tutorial
 @app.route("/tutorials")
 @with_session
 async def tutorials_list(request, session):
-    user = get_current_user(session)
-    courses = build_course_catalog()
-    for course in courses:
-        course["module_count_label"] = format_module_count(course["module_count"])
-        course["basic_count_label"] = format_module_count(course["basic_count"])
-        course["advanced_count_label"] = format_module_count(course["advanced_count"])
-        course["basic_url"] = f"/tutorials/course/{course['slug']}/basic"
-        course["advanced_url"] = f"/tutorials/course/{course['slug']}/advanced"
-
-    return (
-        page_tutorial.render(
+    user_name = await get_current_user_name(session)
+    def render_page():
+        courses = build_course_catalog()
+        return page_tutorial.render(
             courses=courses,
             has_any=any(course["module_count"] > 0 for course in courses),
-            yes_login=bool(user),
-            user_name=user[2] if user else "",
-        ),
-        200,
-        {"Content-Type": "text/html"},
-    )
+            yes_login=bool(user_name),
+            user_name=user_name or "",
+        )
+
+    return html_page_response(request, user_name, render_page)
 
 
 @app.route("/tutorials/course/<course_slug>")
@@ -814,7 +944,7 @@ async def tutorial_course_root(request, session):
 @app.route("/tutorials/course/<course_slug>/<difficulty>")
 @with_session
 async def tutorial_course_page(request, session, course_slug, difficulty):
-    user = get_current_user(session)
+    user = await get_current_user(session)
     normalized_course_slug = str(course_slug or "").strip().lower()
     raw_difficulty = str(difficulty or "").strip().lower()
     normalized_difficulty = normalize_difficulty(difficulty)
@@ -824,30 +954,29 @@ async def tutorial_course_page(request, session, course_slug, difficulty):
             f"/tutorials/course/{normalized_course_slug}/{normalized_difficulty}"
         )
 
-    courses = build_course_catalog()
-    course_map = {course["slug"]: course for course in courses}
-    course = course_map.get(normalized_course_slug)
+    course = tutorial_catalog.get_course(normalized_course_slug)
     if not course:
         return "Курс не найден", 404
 
-    completed_slugs = get_completed_tutorial_slugs(request, user)
-    track_modules = get_course_track_modules(course, normalized_difficulty)
-    modules = annotate_track_modules(track_modules, completed_slugs)
+    completed_slugs = await get_completed_tutorial_slugs(request, user)
 
-    viewer_query = build_viewer_query(course["slug"], normalized_difficulty)
-    for module in modules:
-        module["start_url"] = f"/tutorials/{module['slug']}/1{viewer_query}"
+    def render_page():
+        track_modules = get_course_track_modules(course, normalized_difficulty)
+        modules = annotate_track_modules(track_modules, completed_slugs)
 
-    completed_count = sum(1 for module in modules if module["completed"])
-    is_advanced = normalized_difficulty == "advanced"
-    difficulty_note = (
-        "Расширенный режим включает все базовые модули и дополнительные задания."
-        if is_advanced
-        else "В базовом режиме доступна основная программа курса."
-    )
+        viewer_query = build_viewer_query(course["slug"], normalized_difficulty)
+        for module in modules:
+            module["start_url"] = f"/tutorials/{module['slug']}/1{viewer_query}"
 
-    return (
-        page_tutorial_course.render(
+        completed_count = sum(1 for module in modules if module["completed"])
+        is_advanced = normalized_difficulty == "advanced"
+        difficulty_note = (
+            "Расширенный режим включает все базовые модули и дополнительные задания."
+            if is_advanced
+            else "В базовом режиме доступна основная программа курса."
+        )
+
+        return page_tutorial_course.render(
             course=course,
             modules=modules,
             difficulty=normalized_difficulty,
@@ -855,16 +984,22 @@ async def tutorial_course_page(request, session, course_slug, difficulty):
             difficulty_note=difficulty_note,
             module_count_label=format_module_count(len(modules)),
             completed_count_label=format_module_count(completed_count),
-            basic_count_label=format_module_count(course["basic_count"]),
-            advanced_count_label=format_module_count(course["advanced_count"]),
-            basic_href=f"/tutorials/course/{course['slug']}/basic",
-            advanced_href=f"/tutorials/course/{course['slug']}/advanced",
+            basic_count_label=course["basic_count_label"],
+            advanced_count_label=course["advanced_count_label"],
+            basic_href=course["basic_url"],
+            advanced_href=course["advanced_url"],
             locked_notice=(request.args.get("locked") == "1"),
             yes_login=bool(user),
             user_name=user[2] if user else "",
-        ),
-        200,
-        {"Content-Type": "text/html"},
+        )
+
+    # Прогресс гостя хранится в cookie, поэтому ответ кэшируется только браузером
+    return html_page_response(
+        request,
+        user,
+        render_page,
+        cache_key=tuple(sorted(completed_slugs)),
+        shared=False,
     )
 
 
@@ -890,8 +1025,8 @@ async def tutorial_entrypoint(request, session, tutorial_name):
 @app.route("/tutorials/<tutorial_name>/<int:page_num>")
 @with_session
 async def tutorial_viewer(request, session, tutorial_name, page_num):
-    user = get_current_user(session)
-    completed_slugs = get_completed_tutorial_slugs(request, user)
+    user = await get_current_user(session)
+    completed_slugs = await get_completed_tutorial_slugs(request, user)
 
     raw_requested_course = str(request.args.get("course") or "").strip().lower()
     raw_requested_difficulty = str(request.args.get("difficulty") or "").strip().lower()
@@ -906,53 +1041,34 @@ async def tutorial_viewer(request, session, tutorial_name, page_num):
         redirect_query = build_viewer_query(raw_requested_course, requested_difficulty)
         return redirect(f"/tutorials/{canonical_slug}/{page_num}{redirect_query}")
 
-    # Путь к папке конкретного туториала
-    resolved_tutorial_name = resolve_tutorial_directory(canonical_slug)
-    if not resolved_tutorial_name:
-        return "Интерактивный модуль не найден", 404
-
-    tutorial_path = os.path.join(TUTORIALS_DIR, resolved_tutorial_name)
-
-    if not os.path.exists(tutorial_path):
+    # Страницы туториала берём из кэшированного манифеста каталога
+    manifest = tutorial_catalog.manifest(canonical_slug)
+    if not manifest:
         return "Интерактивный модуль не найден", 404
+    resolved_tutorial_name = manifest.directory
 
-    tutorial_meta = next(
-        (t for t in load_tutorials(include_hidden=True) if t["slug"] == canonical_slug),
-        None,
-    )
-
-    course_catalog = build_course_catalog()
-    course_map = {course["slug"]: course for course in course_catalog}
+    tutorial_meta = tutorial_catalog.get(canonical_slug)
 
     course_slug = str(tutorial_meta.get("course") or "").strip().lower() if tutorial_meta else ""
     if raw_requested_course and raw_requested_course == course_slug:
         course_slug = raw_requested_course
 
-    course_data = course_map.get(course_slug)
+    course_data = tutorial_catalog.get_course(course_slug) if course_slug else None
     viewer_difficulty = requested_difficulty if requested_difficulty in DIFFICULTY_LEVELS else "basic"
     if tutorial_meta and tutorial_meta.get("level") == "advanced":
         viewer_difficulty = "advanced"
 
     if course_data and tutorial_meta:
         track_modules = get_course_track_modules(course_data, viewer_difficulty)
-        track_states = annotate_track_modules(track_modules, completed_slugs)
-        state_by_slug = {module["slug"]: module for module in track_states}
-        current_state = state_by_slug.get(canonical_slug)
-        if current_state and not current_state["unlocked"]:
+        module_idx = get_course_track_index(course_data, viewer_difficulty).get(canonical_slug)
+        if module_idx is not None and not is_track_module_unlocked(
+            track_modules, module_idx, completed_slugs
+        ):
             return redirect(
                 f"/tutorials/course/{course_slug}/{viewer_difficulty}?locked=1"
             )
 
-    # Ищем страницы туториала: Jinja-шаблоны (.tmpl) и обычные HTML (.html/.htm)
-    files = [
-        f
-        for f in os.listdir(tutorial_path)
-        if os.path.splitext(f)[1].lower() in TUTORIAL_PAGE_EXTENSIONS
-    ]
-    # Сортируем по номеру (1, 2, 10), затем по имени
-    files.sort(key=_tutorial_sort_key)
-
-    total_pages = len(files)
+    total_pages = manifest.total_pages
 
     if total_pages == 0:
         return "В этом интерактивном модуле нет страниц", 404
@@ -960,34 +1076,19 @@ async def tutorial_viewer(request, session, tutorial_name, page_num):
     if page_num < 1 or page_num > total_pages:
         return "Такой страницы не существует", 404
 
-    viewer_navigation = (
-        tutorial_meta["viewer_navigation"] if tutorial_meta else "pages"
-    )
-    style_options = []
-    if tutorial_meta and viewer_navigation == "style-switch":
-        for item in tutorial_meta.get("style_options", []):
-            if not isinstance(item, dict):
-                continue
-            option_label = str(item.get("label", "")).strip()
-            option_page = item.get("page")
-            if not option_label or not isinstance(option_page, int):
-                continue
-            if option_page < 1 or option_page > total_pages:
-                continue
-            style_options.append({"label": option_label, "page": option_page})
-        if len(style_options) < 2:
-            viewer_navigation = "pages"
-            style_options = []
-
-    current_file = files[page_num - 1]
+    viewer_navigation = manifest.viewer_navigation
+    style_options = manifest.style_options
+
+    current_file = manifest.pages[page_num - 1]
     should_update_guest_cookie = False
     should_mark_completed = (
         page_num == total_pages or viewer_navigation == "style-switch"
     )
     if should_mark_completed:
         if user:
-            mark_tutorial_completed(user[0], canonical_slug)
-            completed_slugs.add(canonical_slug)
+            if canonical_slug not in completed_slugs:
+                await mark_tutorial_completed(user[0], canonical_slug)
+                completed_slugs.add(canonical_slug)
         elif canonical_slug not in completed_slugs:
             completed_slugs.add(canonical_slug)
             should_update_guest_cookie = True
@@ -1009,10 +1110,16 @@ async def tutorial_viewer(request, session, tutorial_name, page_num):
         tutorial_level = str(tutorial_meta.get("level") or "basic")
 
     try:
-        # 1. Рендерим саму страницу туториала (контент)
-        content_template = env.get_template(template_name)
-        # Если внутри слайдов нужны переменные (например, user), передайте их сюда
-        rendered_content = content_template.render(user=user)
+        # 1. Рендерим саму страницу туториала (контент).
+        # Слайды, которые не используют user, берутся из кэша фрагментов.
+        catalog_snapshot = tutorial_catalog.snapshot()
+        catalog_template_cache.sync(catalog_snapshot)
+        rendered_content = tutorial_fragments.render(
+            template_name,
+            generation=catalog_snapshot.generation,
+            static_content=tutorial_meta.get("static_content") if tutorial_meta else None,
+            user=user,
+        )
 
         # 2. Рендерим оболочку-вьювер и вставляем туда контент
         rendered_page = page_tutorial_viewer.render(
@@ -1050,7 +1157,7 @@ async def tutorial_viewer(request, session, tutorial_name, page_num):
 @app.route("/forgot")
 @with_session
 async def forgot_password_page(request, session):
-    user = get_current_user(session)
+    user_name = await get_current_user_name(session)
     status = request.args.get("status") or ""
     status_map = {
         "blank": "заполните все поля",
@@ -1060,8 +1167,8 @@ async def forgot_password_page(request, session):
     return (
         page_forgot.render(
             status=status_map.get(status, ""),
-            yes_login=bool(user),
-            user_name=user[2] if user else "",
+            yes_login=bool(user_name),
+            user_name=user_name or "",
         ),
         200,
         {"Content-Type": "text/html"},
@@ -1071,7 +1178,7 @@ async def forgot_password_page(request, session):
 @app.route("/support")
 @with_session
 async def support_page(request, session):
-    user = get_current_user(session)
+    user_name = await get_current_user_name(session)
     mode = request.args.get("mode") or "root"
     if mode not in ("root", "problem", "faq"):
         mode = "root"
@@ -1088,19 +1195,18 @@ async def support_page(request, session):
         status_type = "error"
         status_message = "Не удалось отправить сообщение. Попробуйте снова."
 
-    return (
-        page_support.render(
-            yes_login=bool(user),
-            user_name=user[2] if user else "",
+    def render_page():
+        return page_support.render(
+            yes_login=bool(user_name),
+            user_name=user_name or "",
             mode=mode,
             selected_faq=selected_faq,
             selected_faq_key=faq_key,
             status_message=status_message,
             status_type=status_type,
-        ),
-        200,
-        {"Content-Type": "text/html"},
-    )
+        )
+
+    return html_page_response(request, user_name, render_page)
 
 
 # personal account
@@ -1108,11 +1214,11 @@ async def support_page(request, session):
 @app.route("/account/cabinet/")
 @with_session
 async def personal_account_page(request, session):
-    user = get_current_user(session)
+    user = await get_current_user(session)
     if not user:
         return redirect("/login")
 
-    summary_stats, course_stats = build_personal_account_progress(user[0])
+    summary_stats, course_stats = await build_personal_account_progress(user[0])
 
     return (
         page_personal_account.render(
@@ -1131,7 +1237,7 @@ async def personal_account_page(request, session):
 @app.route("/account/")
 @with_session
 async def account_settings(request, session):
-    user = get_current_user(session)
+    user = await get_current_user(session)
     if not user:
         return redirect("/login")
 
@@ -1174,7 +1280,7 @@ async def logoload(request, path):
     if ".." in decoded_path or decoded_path.startswith("/") or decoded_path.startswith("\\"):
         return "Not found", 404
 
-    return send_file("assets/" + decoded_path)
+    return send_cached_file(request, "assets/" + decoded_path)
 
 
 # register route
@@ -1195,10 +1301,12 @@ async def handle_reg(request, session):
         return redirect("/register?error=tel")
 
     normalized_tel = format_phone_number(tel)
+    tel_key = normalize_phone_digits(tel)
 
-    cur.execute("SELECT id, tel FROM users")
-    for existing_user in cur.fetchall():
-        if phone_numbers_equal(existing_user[1], normalized_tel):
+    # Проверка уникальности — один запрос по индексу tel_normalized
+    async with db_async.cursor() as cur:
+        await cur.execute("SELECT id FROM users WHERE tel_normalized = ?", (tel_key,))
+        if await cur.fetchone():
             return redirect("/register?error=exists")
 
     # pwd hashs
@@ -1207,10 +1315,11 @@ async def handle_reg(request, session):
 
     # send db insert
     try:
-        cur.execute(
-            "INSERT INTO users(tel, name, pass) VALUES (?, ?, ?)",
-            (normalized_tel, name, dpass),
-        )
+        async with db_async.cursor() as cur:
+            await cur.execute(
+                "INSERT INTO users(tel, tel_normalized, name, pass) VALUES (?, ?, ?, ?)",
+                (normalized_tel, tel_key, name, dpass),
+            )
         print(f"Registered {name}")
         return redirect(f"/?reg=success")
     except Exception as e:
@@ -1251,19 +1360,39 @@ async def handle_login(request, session):
     hash_object = hashlib.sha256(pwd.encode("utf-8"))
     input_hash = hash_object.hexdigest()
 
-    # 3. Check DB for matching phone and password hash
-    cur.execute("SELECT * FROM users WHERE pass = ?", (input_hash,))
-    user = None
-    for row in cur.fetchall():
-        if phone_numbers_equal(row[1], normalized_tel):
-            user = row
-            break
+    # 3. Find the user by the indexed phone key, then check the password hash
+    async with db_async.cursor() as cur:
+        await cur.execute(
+            "SELECT * FROM users WHERE tel_normalized = ?",
+            (normalize_phone_digits(tel),),
+            prepare=True,
+        )
+        user = await cur.fetchone()
+        if user and not hmac.compare_digest(str(user[3]), input_hash):
+            user = None
+
+        # Старые дубликаты номера остались без tel_normalized при миграции —
+        # ищем среди них прежним сравнением (IS NULL тоже идёт по индексу)
+        if not user:
+            await cur.execute(
+                "SELECT * FROM users WHERE tel_normalized IS NULL AND pass = ?",
+                (input_hash,),
+            )
+            for row in await cur.fetchall():
+                if phone_numbers_equal(row[1], normalized_tel):
+                    user = row
+                    print(f"Login via legacy phone match for user {user[0]}")
+                    break
+
+        # У дубликата номер не переписываем: формат уже занят основной записью
+        if user and user[5] is not None and user[1] != normalized_tel:
+            await cur.execute("UPDATE users SET tel = ? WHERE id = ?", (normalized_tel, user[0]))
 
     if user:
-        if user[1] != normalized_tel and is_valid_phone_number(user[1]):
-            cur.execute("UPDATE users SET tel = ? WHERE id = ?", (normalized_tel, user[0]))
         response = redirect("/?login=success")
+        invalidate_user_cache(user[0])
         session["user_id"] = user[0]
+        remember_user_name(session, user[2])
         session.save()
         return response
     else:
@@ -1273,20 +1402,24 @@ async def handle_login(request, session):
 @app.route("/api/account/update_name", methods=["POST"])
 @with_session
 async def handle_update_name(request, session):
-    user = get_current_user(session)
+    user = await get_current_user(session)
     if not user:
         return redirect("/login")
     new_name = request.form.get("name")
     if not new_name:
         return redirect("/account/?name=blank")
-    cur.execute("UPDATE users SET name = ? WHERE id = ?", (new_name, user[0]))
+    async with db_async.cursor() as cur:
+        await cur.execute("UPDATE users SET name = ? WHERE id = ?", (new_name, user[0]))
+    invalidate_user_cache(user[0])
+    remember_user_name(session, new_name)
+    session.save()
     return redirect("/account/?name=success")
 
 
 @app.route("/api/account/update_tel", methods=["POST"])
 @with_session
 async def handle_update_tel(request, session):
-    user = get_current_user(session)
+    user = await get_current_user(session)
     if not user:
         return redirect("/login")
     new_tel = (request.form.get("tel") or "").strip()
@@ -1297,20 +1430,34 @@ async def handle_update_tel(request, session):
         return redirect("/account/?tel=invalid")
 
     normalized_tel = format_phone_number(new_tel)
+    tel_key = normalize_phone_digits(new_tel)
 
-    cur.execute("SELECT id, tel FROM users WHERE id != ?", (user[0],))
-    for existing_user in cur.fetchall():
-        if phone_numbers_equal(existing_user[1], normalized_tel):
+    async with db_async.cursor() as cur:
+        await cur.execute(
+            "SELECT id FROM users WHERE tel_normalized = ? AND id != ?",
+            (tel_key, user[0]),
+        )
+        if await cur.fetchone():
             return redirect("/account/?tel=exists")
 
-    cur.execute("UPDATE users SET tel = ? WHERE id = ?", (normalized_tel, user[0]))
+        # Номер мог занять параллельный запрос между SELECT и UPDATE
+        try:
+            await cur.execute(
+                "UPDATE users SET tel = ?, tel_normalized = ? WHERE id = ?",
+                (normalized_tel, tel_key, user[0]),
+            )
+        except Exception as exc:
+            if not is_integrity_error(exc):
+                raise
+            return redirect("/account/?tel=exists")
+    invalidate_user_cache(user[0])
     return redirect("/account/?tel=success")
 
 
 @app.route("/api/account/update_password", methods=["POST"])
 @with_session
 async def handle_update_password(request, session):
-    user = get_current_user(session)
+    user = await get_current_user(session)
     if not user:
         return redirect("/login")
     current_pwd = request.form.get("current_pwd")
@@ -1324,14 +1471,16 @@ async def handle_update_password(request, session):
     if current_hash != user[3]:
         return redirect("/account/?pwd=wrong")
     new_hash = hashlib.sha256(new_pwd.encode("utf-8")).hexdigest()
-    cur.execute("UPDATE users SET pass = ? WHERE id = ?", (new_hash, user[0]))
+    async with db_async.cursor() as cur:
+        await cur.execute("UPDATE users SET pass = ? WHERE id = ?", (new_hash, user[0]))
+    invalidate_user_cache(user[0])
     return redirect("/account/?pwd=success")
 
 
 @app.route("/api/account/delete", methods=["POST"])
 @with_session
 async def handle_delete_account(request, session):
-    user = get_current_user(session)
+    user = await get_current_user(session)
     if not user:
         return redirect("/login")
     confirm = request.form.get("confirm_delete")
@@ -1341,8 +1490,13 @@ async def handle_delete_account(request, session):
     pwd_hash = hashlib.sha256(pwd.encode("utf-8")).hexdigest()
     if pwd_hash != user[3]:
         return redirect("/account/?delete=wrong")
-    cur.execute("DELETE FROM tutorial_progress WHERE user_id = ?", (user[0],))
-    cur.execute("DELETE FROM users WHERE id = ?", (user[0],))
+    if progress_writer is not None:
+        progress_writer.discard_user(user[0])
+    async with db_async.cursor() as cur:
+        await cur.execute("DELETE FROM tutorial_progress WHERE user_id = ?", (user[0],))
+        await cur.execute("DELETE FROM users WHERE id = ?", (user[0],))
+    invalidate_user_cache(user[0])
+    invalidate_progress_cache(user[0])
     response = redirect("/?account=deleted")
     session.delete()
     return response
@@ -1359,19 +1513,21 @@ async def handle_forgot_password(request, session):
         return redirect("/forgot?status=blank")
     if new_pwd != new_pwd_confirm:
         return redirect("/forgot?status=nomatch")
-    cur.execute("SELECT id FROM users WHERE tel = ? AND name = ?", (tel, name))
-    user = cur.fetchone()
-    if not user:
-        return redirect("/forgot?status=notfound")
-    new_hash = hashlib.sha256(new_pwd.encode("utf-8")).hexdigest()
-    cur.execute("UPDATE users SET pass = ? WHERE id = ?", (new_hash, user[0]))
+    async with db_async.cursor() as cur:
+        await cur.execute("SELECT id FROM users WHERE tel = ? AND name = ?", (tel, name))
+        user = await cur.fetchone()
+        if not user:
+            return redirect("/forgot?status=notfound")
+        new_hash = hashlib.sha256(new_pwd.encode("utf-8")).hexdigest()
+        await cur.execute("UPDATE users SET pass = ? WHERE id = ?", (new_hash, user[0]))
+    invalidate_user_cache(user[0])
     return redirect("/login?reset=success")
 
 
 @app.route("/api/support/problem", methods=["POST"])
 @with_session
 async def handle_support_problem_report(request, session):
-    user = get_current_user(session)
+    user = await get_current_user(session)
     problem_key = request.form.get("problem")
     problem_label = SUPPORT_PROBLEM_LABELS.get(problem_key)
     if not problem_label:
@@ -1382,19 +1538,18 @@ async def handle_support_problem_report(request, session):
             fallback_url="/support?mode=problem&sent=0",
         )
 
-    try:
-        append_bug_report(
-            report_kind="problem",
-            report_code=problem_key,
-            label=problem_label,
-            user=user,
-        )
-    except OSError:
+    if not append_bug_report(
+        report_kind="problem",
+        report_code=problem_key,
+        label=problem_label,
+        user=user,
+    ):
         return _support_api_response(
             request,
             ok=False,
-            message="Не удалось отправить сообщение. Попробуйте снова.",
+            message=SUPPORT_QUEUE_FULL_MESSAGE,
             fallback_url="/support?mode=problem&sent=0",
+            status_code=503,
         )
     return _support_api_response(
         request,
@@ -1407,7 +1562,7 @@ async def handle_support_problem_report(request, session):
 @app.route("/api/support/faq_feedback", methods=["POST"])
 @with_session
 async def handle_support_faq_feedback(request, session):
-    user = get_current_user(session)
+    user = await get_current_user(session)
     faq_key = request.form.get("faq")
     feedback_key = request.form.get("feedback")
     faq_data = SUPPORT_FAQ_DATA.get(faq_key)
@@ -1420,19 +1575,18 @@ async def handle_support_faq_feedback(request, session):
             fallback_url=f"/support?mode=faq&faq={faq_key or ''}&sent=0",
         )
 
-    try:
-        append_bug_report(
-            report_kind="faq_feedback",
-            report_code=f"{faq_key}:{feedback_key}",
-            label=f"{faq_data['question']} / {feedback_label}",
-            user=user,
-        )
-    except OSError:
+    if not append_bug_report(
+        report_kind="faq_feedback",
+        report_code=f"{faq_key}:{feedback_key}",
+        label=f"{faq_data['question']} / {feedback_label}",
+        user=user,
+    ):
         return _support_api_response(
             request,
             ok=False,
-            message="Не удалось отправить сообщение. Попробуйте снова.",
+            message=SUPPORT_QUEUE_FULL_MESSAGE,
             fallback_url=f"/support?mode=faq&faq={faq_key}&sent=0",
+            status_code=503,
         )
     return _support_api_response(
         request,
@@ -1442,10 +1596,64 @@ async def handle_support_faq_feedback(request, session):
     )
 
 
+def _is_admin(user) -> bool:
+    return bool(user and user[4])
+
+
+def _admin_json_response(body: dict, status_code: int = 200):
+    headers = {"Content-Type": "application/json; charset=utf-8", "Cache-Control": "no-store"}
+    return json.dumps(body, ensure_ascii=False), status_code, headers
+
+
+ADMIN_FORBIDDEN_BODY = {"ok": False, "message": "Недостаточно прав."}
+
+
+@app.route("/api/support/stats")
+@with_session
+async def support_stats(request, session):
+    """Support report counts for admins; served from running aggregates, not the report files."""
+    user = await get_current_user(session)
+    if not _is_admin(user):
+        return _admin_json_response(ADMIN_FORBIDDEN_BODY, 403)
+    raw_days = request.args.get("days") or str(SUPPORT_STATS_DEFAULT_DAYS)
+    if not raw_days.isdigit() or not 1 <= int(raw_days) <= SUPPORT_STATS_MAX_DAYS:
+        body = {"ok": False, "message": f"days должен быть от 1 до {SUPPORT_STATS_MAX_DAYS}."}
+        return _admin_json_response(body, 400)
+    return _admin_json_response(
+        {
+            "ok": True,
+            "days": int(raw_days),
+            **bug_report_store.stats.snapshot(days=int(raw_days)),
+            "queue": bug_report_queue.stats(),
+        }
+    )
+
+
+@app.route("/api/admin/cache_stats")
+@with_session
+async def cache_stats(request, session):
+    """In-process cache counters for admins (templates, fragments, users, progress, DB)."""
+    user = await get_current_user(session)
+    if not _is_admin(user):
+        return _admin_json_response(ADMIN_FORBIDDEN_BODY, 403)
+    return _admin_json_response(
+        {
+            "ok": True,
+            "templates": catalog_template_cache.stats(),
+            "tutorial_fragments": tutorial_fragments.stats(),
+            "users": user_cache.stats(),
+            "progress": progress_cache.stats(),
+            "progress_writer": progress_writer.stats() if progress_writer is not None else None,
+            "db_pool": db_async.stats(),
+            "query_cache": query_cache_stats(),
+        }
+    )
+
+
 @app.route("/getcookie")
 @with_session
 async def get_cookie_page(request, session):
-    user_data = get_current_user(session)
+    user_data = await get_current_user(session)
     if user_data:
         user_name = user_data[2]
         return (
@@ -1470,4 +1678,10 @@ async def logout(request, session):
 
 
 if __name__ == "__main__":
-    app.run()
+    try:
+        app.run()
+    finally:
+        flush_pending_progress()
+        flush_pending_bug_reports()
+        asyncio.run(db_async.close())
+        db_pool.close()
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+
+def normalize_phone_digits(raw_phone: str):
+    """Return normalized Russian phone digits (11 digits with 7-prefix)."""
+    digits = "".join(char for char in str(raw_phone or "") if char.isdigit())
+    if len(digits) == 11 and digits[0] in ("7", "8"):
+        return "7" + digits[1:]
+    if len(digits) == 10:
+        return "7" + digits
+    return ""
+
+
+def is_valid_phone_number(raw_phone: str):
+    """Validate phone number as a Russian mobile-compatible format."""
+    return bool(normalize_phone_digits(raw_phone))
+
+
+def format_phone_number(raw_phone: str):
+    """Format phone to canonical +7 (XXX) XXX-XX-XX representation."""
+    normalized = normalize_phone_digits(raw_phone)
+    if not normalized:
+        return ""
+    return (
+        f"+7 ({normalized[1:4]}) "
+        f"{normalized[4:7]}-{normalized[7:9]}-{normalized[9:11]}"
+    )
+
+
+def phone_numbers_equal(left_phone: str, right_phone: str):
+    """Compare phone numbers by normalized digits (or raw fallback)."""
+    left_normalized = normalize_phone_digits(left_phone)
+    right_normalized = normalize_phone_digits(right_phone)
+    if left_normalized and right_normalized:
+        return left_normalized == right_normalized
+    return str(left_phone or "").strip() == str(right_phone or "").strip()
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import traceback
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable, Mapping
+
+PROGRESS_WRITE_MODES = ("sync", "batched")
+DEFAULT_PROGRESS_WRITE_MODE = "sync"
+DEFAULT_PROGRESS_BATCH_SIZE = 200
+DEFAULT_PROGRESS_FLUSH_INTERVAL = 1.0
+
+ProgressRow = tuple[int, str]
+
+
+@dataclass(frozen=True)
+class ProgressWriterSettings:
+    mode: str = DEFAULT_PROGRESS_WRITE_MODE
+    batch_size: int = DEFAULT_PROGRESS_BATCH_SIZE
+    flush_interval: float = DEFAULT_PROGRESS_FLUSH_INTERVAL
+
+    @property
+    def batched(self) -> bool:
+        return self.mode == "batched"
+
+
+def load_progress_writer_settings(
+    environ: Mapping[str, str] | None = None,
+) -> ProgressWriterSettings:
+    env = os.environ if environ is None else environ
+
+    mode = (env.get("PROGRESS_WRITE_MODE") or DEFAULT_PROGRESS_WRITE_MODE).strip().lower()
+    if mode not in PROGRESS_WRITE_MODES:
+        raise ValueError(
+            f"PROGRESS_WRITE_MODE must be one of: {', '.join(PROGRESS_WRITE_MODES)}."
+        )
+
+    raw_batch_size = (env.get("PROGRESS_BATCH_SIZE") or "").strip()
+    raw_interval = (env.get("PROGRESS_FLUSH_INTERVAL_SECONDS") or "").strip()
+    try:
+        batch_size = int(raw_batch_size) if raw_batch_size else DEFAULT_PROGRESS_BATCH_SIZE
+        flush_interval = float(raw_interval) if raw_interval else DEFAULT_PROGRESS_FLUSH_INTERVAL
+    except ValueError as exc:
+        raise ValueError(
+            "PROGRESS_BATCH_SIZE must be an integer and "
+            "PROGRESS_FLUSH_INTERVAL_SECONDS a number."
+        ) from exc
+    if batch_size < 1 or flush_interval <= 0:
+        raise ValueError("Progress batch size and flush interval must be positive.")
+
+    return ProgressWriterSettings(mode=mode, batch_size=batch_size, flush_interval=flush_interval)
+
+
+class ProgressWriteBehind:
+    """Coalesces tutorial completion events and writes them in batches.
+
+    Events are de-duplicated per ``(user_id, slug)`` while queued and are
+    flushed through ``write_batch`` when ``batch_size`` rows are pending or
+    every ``flush_interval`` seconds. Rows of a failed flush go back to the
+    queue and are retried with the next batch.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[list[ProgressRow]], Awaitable[None]],
+        batch_size: int = DEFAULT_PROGRESS_BATCH_SIZE,
+        flush_interval: float = DEFAULT_PROGRESS_FLUSH_INTERVAL,
+    ):
+        self._write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: dict[int, set[str]] = {}
+        self._pending_count = 0
+        self._flush_lock: asyncio.Lock | None = None
+        self._loop_task: asyncio.Task | None = None
+        self._flush_tasks: set[asyncio.Task] = set()
+        self.enqueued = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.written_rows = 0
+        self.failed_flushes = 0
+
+    def __len__(self) -> int:
+        return self._pending_count
+
+    def add(self, user_id: int, tutorial_slug: str):
+        slugs = self._pending.setdefault(user_id, set())
+        if tutorial_slug in slugs:
+            self.coalesced += 1
+            return
+        slugs.add(tutorial_slug)
+        self._pending_count += 1
+        self.enqueued += 1
+        self._ensure_background_flush()
+        if self._pending_count >= self.batch_size:
+            task = asyncio.get_running_loop().create_task(self.flush())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    def pending_slugs(self, user_id: int) -> frozenset[str]:
+        return frozenset(self._pending.get(user_id, ()))
+
+    def discard_user(self, user_id: int):
+        self._pending_count -= len(self._pending.pop(user_id, ()))
+
+    def take_pending(self) -> list[ProgressRow]:
+        rows = [
+            (user_id, tutorial_slug)
+            for user_id, slugs in self._pending.items()
+            for tutorial_slug in sorted(slugs)
+        ]
+        self._pending = {}
+        self._pending_count = 0
+        return rows
+
+    def _requeue(self, rows: Iterable[ProgressRow]):
+        for user_id, tutorial_slug in rows:
+            slugs = self._pending.setdefault(user_id, set())
+            if tutorial_slug not in slugs:
+                slugs.add(tutorial_slug)
+                self._pending_count += 1
+
+    async def flush(self) -> int:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            rows = self.take_pending()
+            if not rows:
+                return 0
+            try:
+                await self._write_batch(rows)
+            except asyncio.CancelledError:
+                # Loop shutdown: keep the rows for the synchronous flush at exit.
+                # Inserts are idempotent, so a batch that did reach the DB is harmless
+                self._requeue(rows)
+                raise
+            except Exception:
+                self.failed_flushes += 1
+                self._requeue(rows)
+                traceback.print_exc()
+                return 0
+            self.flushes += 1
+            self.written_rows += len(rows)
+            return len(rows)
+
+    def _ensure_background_flush(self):
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self) -> int:
+        """Stop the background flusher and write everything still queued."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        if self._loop_task is not None:
+            # Cancel only between flushes: rows cancelled mid-write are not requeued
+            async with self._flush_lock:
+                self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        return await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._pending_count,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "written_rows": self.written_rows,
+            "failed_flushes": self.failed_flushes,
+        }
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from typing import Any
+
+from jinja2 import Environment, meta
+
+from caching import LRUCache
+
+DEFAULT_FRAGMENT_CACHE_BYTES = 8 * 1024 * 1024
+USER_CONTEXT_NAMES = frozenset({"user"})
+
+
+def parse_cache_bytes(raw_value: str | None, default: int = DEFAULT_FRAGMENT_CACHE_BYTES) -> int:
+    value = (raw_value or "").strip()
+    if not value:
+        return default
+    try:
+        return max(int(value), 0)
+    except ValueError as exc:
+        raise ValueError("Cache size must be an integer number of bytes.") from exc
+
+
+def template_is_user_independent(env: Environment, template_name: str) -> bool:
+    """Return True when the template cannot observe the per-request context.
+
+    Templates that include, import or extend other templates are treated as
+    user-dependent, because the referenced templates are not inspected.
+    """
+    source, _, _ = env.loader.get_source(env, template_name)
+    parsed = env.parse(source)
+    if any(True for _ in meta.find_referenced_templates(parsed)):
+        return False
+    return not (meta.find_undeclared_variables(parsed) & USER_CONTEXT_NAMES)
+
+
+class FragmentCache:
+    """Caches rendered tutorial slides that do not depend on the current user.
+
+    Entries are keyed by catalog generation, so a catalog rebuild naturally
+    retires every fragment rendered from the previous tree.
+    """
+
+    def __init__(self, env: Environment, max_bytes: int = DEFAULT_FRAGMENT_CACHE_BYTES):
+        self.env = env
+        self._fragments = LRUCache(
+            max_bytes=max_bytes,
+            sizeof=lambda value: len(value.encode("utf-8")),
+        )
+        self._user_independent: dict[tuple[int, str], bool] = {}
+        self._generation: int | None = None
+
+    def render(
+        self,
+        template_name: str,
+        generation: int,
+        static_content: bool | None = None,
+        **context: Any,
+    ) -> str:
+        if generation != self._generation:
+            self._fragments.clear()
+            self._user_independent.clear()
+            self._generation = generation
+
+        if static_content is None:
+            static_content = self._is_user_independent(template_name, generation)
+        if not static_content or self._fragments.max_bytes == 0:
+            return self.env.get_template(template_name).render(**context)
+
+        key = (generation, template_name)
+        rendered = self._fragments.get(key)
+        if rendered is None:
+            rendered = self.env.get_template(template_name).render()
+            self._fragments.set(key, rendered)
+        return rendered
+
+    def stats(self) -> dict:
+        return self._fragments.stats()
+
+    def _is_user_independent(self, template_name: str, generation: int) -> bool:
+        key = (generation, template_name)
+        user_independent = self._user_independent.get(key)
+        if user_independent is None:
+            user_independent = template_is_user_independent(self.env, template_name)
+            self._user_independent[key] = user_independent
+        return user_independent
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping
+
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    TemplateSyntaxError,
+    select_autoescape,
+)
+from jinja2.utils import LRUCache as JinjaLRUCache
+
+from tutorial_catalog import TUTORIAL_PAGE_EXTENSIONS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+DEFAULT_TEMPLATE_BYTECODE_DIR = os.path.join(BASE_DIR, ".jinja_cache")
+BYTECODE_CACHE_PATTERN = "__jinja2_%s.cache"
+DISABLED_VALUES = ("off", "0", "false", "none")
+DEFAULT_TEMPLATE_CACHE_SIZE = 400
+# Room for tutorials added between catalog refreshes
+TEMPLATE_CACHE_HEADROOM = 1.25
+
+
+@dataclass(frozen=True)
+class TemplateSettings:
+    auto_reload: bool = False
+    # None: sized from the tutorial catalog
+    cache_size: int | None = None
+
+
+def load_bytecode_cache_dir(environ: Mapping[str, str] | None = None) -> str | None:
+    """Directory for compiled templates, or None when the cache is turned off."""
+    env = os.environ if environ is None else environ
+    value = (env.get("TEMPLATE_BYTECODE_CACHE_DIR") or "").strip()
+    if not value:
+        return DEFAULT_TEMPLATE_BYTECODE_DIR
+    if value.lower() in DISABLED_VALUES:
+        return None
+    return value
+
+
+def load_template_settings(environ: Mapping[str, str] | None = None) -> TemplateSettings:
+    env = os.environ if environ is None else environ
+
+    auto_reload = (env.get("TEMPLATE_AUTO_RELOAD") or "off").strip().lower()
+    if auto_reload not in ("on", "off", "1", "0", "true", "false"):
+        raise ValueError("TEMPLATE_AUTO_RELOAD must be 'on' or 'off'.")
+
+    raw_cache_size = (env.get("TEMPLATE_CACHE_SIZE") or "").strip()
+    cache_size = None
+    if raw_cache_size:
+        try:
+            cache_size = int(raw_cache_size)
+        except ValueError as exc:
+            raise ValueError("TEMPLATE_CACHE_SIZE must be an integer.") from exc
+        if cache_size < 1:
+            raise ValueError("TEMPLATE_CACHE_SIZE must be positive.")
+
+    return TemplateSettings(auto_reload=auto_reload in ("on", "1", "true"), cache_size=cache_size)
+
+
+class TemplateLRUCache(JinjaLRUCache):
+    """Jinja's template LRU with hit, miss and eviction counters."""
+
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        try:
+            value = self[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key: Any, value: Any):
+        if key not in self._mapping and len(self._mapping) >= self.capacity:
+            self.evictions += 1
+        super().__setitem__(key, value)
+
+    def reset(self, capacity: int):
+        """Drop every compiled template and change the capacity."""
+        with self._wlock:
+            self._mapping.clear()
+            self._queue.clear()
+            self.capacity = capacity
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def template_cache_size(page_templates: int, tutorial_pages: int) -> int:
+    return max(math.ceil((page_templates + tutorial_pages) * TEMPLATE_CACHE_HEADROOM), 1)
+
+
+class CatalogTemplateCache:
+    """Keeps the environment's template cache in step with the tutorial catalog.
+
+    With ``auto_reload`` off Jinja never stats a cached template again, so
+    each new catalog generation (a slide or tutorial changed on disk) drops
+    the cached templates instead. Unless ``TEMPLATE_CACHE_SIZE`` is set, the
+    capacity follows the number of page templates plus tutorial pages in
+    the catalog manifests, so the LRU never evicts in steady state.
+    """
+
+    def __init__(self, env: Environment, settings: TemplateSettings, page_templates: int):
+        self.env = env
+        self.settings = settings
+        self.page_templates = page_templates
+        self._generation: int | None = None
+
+    def sync(self, snapshot) -> bool:
+        if snapshot.generation == self._generation:
+            return False
+        self._generation = snapshot.generation
+        capacity = self.settings.cache_size
+        if capacity is None:
+            tutorial_pages = sum(
+                manifest.total_pages for manifest in snapshot.manifests.values()
+            )
+            capacity = template_cache_size(self.page_templates, tutorial_pages)
+        self.env.cache.reset(capacity)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            **self.env.cache.stats(),
+            "auto_reload": self.env.auto_reload,
+            "generation": self._generation,
+        }
+
+
+def create_bytecode_cache(directory: str | None) -> FileSystemBytecodeCache | None:
+    if directory is None:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory, BYTECODE_CACHE_PATTERN)
+
+
+def create_template_environment(
+    bytecode_dir: str | None = None, settings: TemplateSettings | None = None
+) -> Environment:
+    """The application's Jinja environment.
+
+    Compiled code depends on the environment options (autoescape in
+    particular), so the app and the ``precompile`` command must both build
+    their environment here for the cached bytecode to be valid. Templates
+    are loaded from the directory directly (``PackageLoader("main")`` would
+    import the whole app just to find it).
+    """
+    settings = settings or TemplateSettings()
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=select_autoescape(),
+        bytecode_cache=create_bytecode_cache(bytecode_dir),
+        auto_reload=settings.auto_reload,
+    )
+    env.cache = TemplateLRUCache(settings.cache_size or DEFAULT_TEMPLATE_CACHE_SIZE)
+    return env
+
+
+def is_compiled_template(template_name: str) -> bool:
+    return os.path.splitext(template_name)[1].lower() in TUTORIAL_PAGE_EXTENSIONS
+
+
+def compilable_template_names(env: Environment) -> list[str]:
+    """Page templates and tutorial slides; assets and .gz/.br variants are skipped."""
+    return env.list_templates(filter_func=is_compiled_template)
+
+
+def precompile_templates(env: Environment, template_names: Iterable[str] | None = None):
+    """Load every template once so its bytecode lands in the cache.
+
+    Returns ``(compiled, failed)`` where ``failed`` lists templates that are
+    not valid Jinja (for example plain HTML pages with stray braces).
+    """
+    compiled = []
+    failed = []
+    names = compilable_template_names(env) if template_names is None else template_names
+    for template_name in names:
+        try:
+            env.get_template(template_name)
+        except TemplateSyntaxError as exc:
+            failed.append((template_name, str(exc)))
+            continue
+        compiled.append(template_name)
+    return compiled, failed
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Jinja template cache tools.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    precompile = subcommands.add_parser(
+        "precompile", help="compile page and tutorial templates into the bytecode cache"
+    )
+    precompile.add_argument("--cache-dir", default=None)
+    subcommands.add_parser("clear", help="remove cached template bytecode")
+    args = parser.parse_args(argv)
+
+    bytecode_dir = getattr(args, "cache_dir", None) or load_bytecode_cache_dir()
+    if bytecode_dir is None:
+        parser.error("TEMPLATE_BYTECODE_CACHE_DIR is off: set a directory or pass --cache-dir")
+    env = create_template_environment(bytecode_dir)
+
+    if args.command == "precompile":
+        started = time.perf_counter()
+        compiled, failed = precompile_templates(env)
+        elapsed = time.perf_counter() - started
+        for template_name, error in failed:
+            print(f"skipped {template_name}: {error}")
+        print(f"Compiled templates: {len(compiled)} in {elapsed:.2f}s -> {bytecode_dir}")
+    elif args.command == "clear":
+        env.bytecode_cache.clear()
+        print(f"Cleared template bytecode in {bytecode_dir}")
+
+
+if __name__ == "__main__":
+    main()
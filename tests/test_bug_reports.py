@@ -0,0 +1,299 @@
+import asyncio
+import json
+import os
+import threading
+from datetime import date
+
+import pytest
+
+from bug_reports import (
+    BugReportQueue,
+    BugReportSettings,
+    BugReportStats,
+    BugReportStore,
+    import_legacy_reports,
+    load_bug_report_settings,
+    stats_path_for,
+)
+
+
+def test_load_bug_report_settings_reads_environment(tmp_path):
+    settings = load_bug_report_settings(
+        {
+            "BUG_REPORTS_PATH": str(tmp_path / "reports.jsonl"),
+            "BUG_REPORTS_MAX_BYTES": "4096",
+            "BUG_REPORTS_BACKUP_COUNT": "2",
+        }
+    )
+    assert settings == BugReportSettings(str(tmp_path / "reports.jsonl"), 4096, 2)
+    with pytest.raises(ValueError):
+        load_bug_report_settings({"BUG_REPORTS_MAX_BYTES": "lots"})
+    with pytest.raises(ValueError):
+        load_bug_report_settings({"BUG_REPORTS_QUEUE_SIZE": "0"})
+
+
+def test_store_appends_one_json_line_per_report(tmp_path):
+    store = BugReportStore(str(tmp_path / "reports.jsonl"))
+    store.append({"report_kind": "problem", "label": "Не работает видео"})
+    store.append({"report_kind": "faq_feedback", "label": "Помогло"})
+
+    lines = (tmp_path / "reports.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["report_kind"] for line in lines] == ["problem", "faq_feedback"]
+    assert "Не работает видео" in lines[0]
+
+
+def test_store_keeps_every_report_under_concurrent_appends(tmp_path):
+    store = BugReportStore(str(tmp_path / "reports.jsonl"))
+
+    def submit(worker):
+        for index in range(50):
+            store.append({"worker": worker, "index": index})
+
+    threads = [threading.Thread(target=submit, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(list(store.iter_reports())) == 400
+
+
+def test_store_rotates_by_size_and_reads_oldest_first(tmp_path):
+    store = BugReportStore(str(tmp_path / "reports.jsonl"), max_bytes=60, backup_count=2)
+    for index in range(6):
+        store.append({"index": index, "label": "x" * 10})
+
+    assert (tmp_path / "reports.jsonl.1").exists()
+    assert (tmp_path / "reports.jsonl.2").exists()
+    assert not (tmp_path / "reports.jsonl.3").exists()
+    indexes = [report["index"] for report in store.iter_reports()]
+    assert indexes == sorted(indexes)
+    assert indexes[-1] == 5
+
+
+def test_store_skips_torn_lines(tmp_path):
+    path = tmp_path / "reports.jsonl"
+    path.write_text('{"index": 0}\n{"index": 1\n', encoding="utf-8")
+    store = BugReportStore(str(path))
+    store.append({"index": 2})
+
+    assert [report["index"] for report in store.iter_reports()] == [0, 2]
+
+
+def test_import_legacy_reports_runs_once(tmp_path):
+    legacy = tmp_path / "bugreports.json"
+    legacy.write_text(
+        json.dumps([{"report_kind": "problem"}, {"report_kind": "faq_feedback"}]),
+        encoding="utf-8",
+    )
+    store = BugReportStore(str(tmp_path / "reports.jsonl"))
+
+    assert import_legacy_reports(store, str(legacy)) == 2
+    assert import_legacy_reports(store, str(legacy)) == 0
+    assert not legacy.exists()
+    assert (tmp_path / "bugreports.json.imported").exists()
+    assert [report["report_kind"] for report in store.iter_reports()] == [
+        "problem",
+        "faq_feedback",
+    ]
+
+
+def test_import_legacy_reports_ignores_empty_file(tmp_path):
+    legacy = tmp_path / "bugreports.json"
+    legacy.write_text("", encoding="utf-8")
+    store = BugReportStore(str(tmp_path / "reports.jsonl"))
+
+    assert import_legacy_reports(store, str(legacy)) == 0
+    assert legacy.exists()
+
+
+def test_import_legacy_reports_skips_torn_file_unless_strict(tmp_path, capsys):
+    legacy = tmp_path / "bugreports.json"
+    legacy.write_text('[{"a": 1},', encoding="utf-8")
+    store = BugReportStore(str(tmp_path / "reports.jsonl"))
+
+    assert import_legacy_reports(store, str(legacy), strict=False) == 0
+    assert "Skipped importing" in capsys.readouterr().out
+    assert legacy.exists()
+    with pytest.raises(ValueError):
+        import_legacy_reports(store, str(legacy))
+
+
+def test_import_legacy_reports_once_across_concurrent_workers(tmp_path):
+    legacy = tmp_path / "bugreports.json"
+    legacy.write_text(json.dumps([{"index": index} for index in range(50)]), encoding="utf-8")
+    path = str(tmp_path / "reports.jsonl")
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        # Separate stores, as in separate worker processes
+        store = BugReportStore(path)
+        barrier.wait()
+        results.append(import_legacy_reports(store, str(legacy), strict=False))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [0] * 7 + [50]
+    assert len(list(BugReportStore(path).iter_reports())) == 50
+    assert (tmp_path / "bugreports.json.imported").exists()
+
+
+def test_rotation_is_shared_by_stores_of_several_processes(tmp_path):
+    path = str(tmp_path / "reports.jsonl")
+    errors = []
+
+    def submit(worker):
+        store = BugReportStore(path, max_bytes=200, backup_count=1000)
+        try:
+            for index in range(100):
+                store.append({"worker": worker, "index": index})
+        except OSError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=submit, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(list(BugReportStore(path, backup_count=1000).iter_reports())) == 400
+
+
+class FailingStore:
+    def __init__(self, failures):
+        self.failures = failures
+        self.batches = []
+
+    def append_many(self, reports):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.batches.append(list(reports))
+        return len(reports)
+
+
+def test_queue_writes_reports_in_background_batches(tmp_path):
+    store = BugReportStore(str(tmp_path / "reports.jsonl"))
+
+    async def run():
+        queue = BugReportQueue(store, max_size=10, batch_size=10)
+        accepted = [queue.submit({"index": index}) for index in range(3)]
+        assert not (tmp_path / "reports.jsonl").exists()
+        for _ in range(50):
+            if queue.written == 3:
+                break
+            await asyncio.sleep(0.01)
+        await queue.close()
+        return queue, accepted
+
+    queue, accepted = asyncio.run(run())
+    assert accepted == [True, True, True]
+    assert [report["index"] for report in store.iter_reports()] == [0, 1, 2]
+    assert queue.stats()["written"] == 3
+
+
+def test_queue_rejects_reports_when_full_and_drains_on_close(tmp_path):
+    store = FailingStore(failures=0)
+
+    async def run():
+        queue = BugReportQueue(store, max_size=2, batch_size=1)
+        results = [queue.submit({"index": index}) for index in range(3)]
+        written = await queue.close()
+        return queue, results, written
+
+    queue, results, written = asyncio.run(run())
+    assert results == [True, True, False]
+    assert written == 2
+    assert store.batches == [[{"index": 0}], [{"index": 1}]]
+    assert queue.stats()["rejected"] == 1
+
+
+def test_queue_retries_failed_batches_in_order():
+    store = FailingStore(failures=1)
+
+    async def run():
+        queue = BugReportQueue(store, max_size=10, batch_size=10, retry_delay=0.01)
+        queue.submit({"index": 0})
+        queue.submit({"index": 1})
+        for _ in range(50):
+            if queue.written == 2:
+                break
+            await asyncio.sleep(0.01)
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(run())
+    assert store.batches == [[{"index": 0}, {"index": 1}]]
+    assert queue.failed_batches == 1
+
+
+def _report(day, code, kind="problem"):
+    return {"created_at": f"{day}T10:00:00+00:00", "report_kind": kind, "report_code": code}
+
+
+def test_stats_count_reports_by_kind_code_and_day(tmp_path):
+    stats = BugReportStats(str(tmp_path / "reports.stats.json"))
+    store = BugReportStore(str(tmp_path / "reports.jsonl"), stats=stats)
+    store.append(_report("2026-10-01", "video_not_opening"))
+    store.append_many(
+        [
+            _report("2026-10-16", "video_not_opening"),
+            _report("2026-10-17", "video_not_opening"),
+            _report("2026-10-17", "wifi:resolved", kind="faq_feedback"),
+        ]
+    )
+
+    snapshot = stats.snapshot(days=2, today=date(2026, 10, 17))
+    assert snapshot["total"] == 4
+    assert snapshot["by_kind"] == {"problem": 3, "faq_feedback": 1}
+    assert snapshot["by_code"]["video_not_opening"] == 3
+    assert snapshot["by_day"] == {
+        "2026-10-16": {"total": 1, "by_code": {"video_not_opening": 1}},
+        "2026-10-17": {"total": 2, "by_code": {"video_not_opening": 1, "wifi:resolved": 1}},
+    }
+
+
+def test_stats_are_persisted_and_rebuilt_when_missing(tmp_path):
+    path = str(tmp_path / "reports.jsonl")
+    settings = BugReportSettings(path=path)
+    store = BugReportStore.from_settings(settings)
+    store.append(_report("2026-10-17", "video_not_opening"))
+    assert os.path.exists(stats_path_for(path))
+
+    # Persisted counts are used as is, without reading the reports
+    with open(path, "a", encoding="utf-8") as reports_file:
+        reports_file.write(json.dumps(_report("2026-10-17", "other")) + "\n")
+    assert BugReportStore.from_settings(settings).stats.total == 1
+
+    os.remove(stats_path_for(path))
+    assert BugReportStore.from_settings(settings).stats.snapshot()["by_code"] == {
+        "video_not_opening": 1,
+        "other": 1,
+    }
+
+
+def test_stats_add_up_reports_from_several_processes(tmp_path):
+    path = str(tmp_path / "reports.stats.sqlite3")
+    first = BugReportStats.load_or_rebuild(path, [])
+    second = BugReportStats.load_or_rebuild(path, [_report("2026-10-17", "ignored")])
+    first.record([_report("2026-10-17", "video_not_opening")])
+    second.record([_report("2026-10-17", "video_not_opening"), _report("2026-10-17", "wifi")])
+
+    for stats in (first, second):
+        snapshot = stats.snapshot()
+        assert snapshot["total"] == 3
+        assert snapshot["by_code"] == {"video_not_opening": 2, "wifi": 1}
+
+
+def test_stats_rebuild_a_torn_stats_file(tmp_path):
+    path = tmp_path / "reports.stats.sqlite3"
+    path.write_bytes(b'{"version": 1, "total"')
+
+    stats = BugReportStats.load_or_rebuild(str(path), [_report("2026-10-17", "wifi")])
+    assert stats.snapshot()["by_code"] == {"wifi": 1}
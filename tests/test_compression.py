@@ -0,0 +1,211 @@
+import asyncio
+import gzip
+import os
+
+import pytest
+from microdot import Microdot
+from microdot.test_client import TestClient
+
+from compression import (
+    CompressionSettings,
+    install_response_compression,
+    is_compressible_content_type,
+    load_compression_settings,
+    negotiated_etag,
+    parse_accept_encoding,
+    precompress_file,
+    precompress_tree,
+    select_precompressed,
+)
+
+
+def _write(path, data):
+    with open(path, "wb") as target:
+        target.write(data)
+
+
+def test_parse_accept_encoding_reads_quality_values():
+    assert parse_accept_encoding("gzip, br;q=0.5, identity;q=0") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "identity": 0.0,
+    }
+    assert parse_accept_encoding(None) == {}
+    assert parse_accept_encoding("gzip;q=abc") == {"gzip": 0.0}
+
+
+def test_precompress_file_writes_gzip_variant_with_original_mtime(tmp_path):
+    source = tmp_path / "style.css"
+    data = b"body { color: black; }\n" * 100
+    _write(source, data)
+
+    written = precompress_file(str(source))
+
+    assert str(source) + ".gz" in written
+    assert gzip.decompress((tmp_path / "style.css.gz").read_bytes()) == data
+    assert os.stat(str(source) + ".gz").st_mtime_ns == os.stat(source).st_mtime_ns
+
+
+def test_precompress_tree_skips_small_and_binary_files(tmp_path):
+    _write(tmp_path / "tiny.js", b"x=1")
+    _write(tmp_path / "image.png", b"\0" * 4096)
+    _write(tmp_path / "app.js", b"console.log('hello');\n" * 100)
+
+    written = precompress_tree([str(tmp_path)])
+
+    assert written == [str(tmp_path / "app.js.gz")]
+
+
+def test_select_precompressed_honours_accept_encoding(tmp_path):
+    source = tmp_path / "app.js"
+    _write(source, b"console.log('hello');\n" * 100)
+    precompress_file(str(source))
+
+    assert select_precompressed(str(source), "gzip, deflate") == (str(source) + ".gz", "gzip")
+    assert select_precompressed(str(source), "*") == (str(source) + ".gz", "gzip")
+    assert select_precompressed(str(source), "gzip;q=0, deflate") == (str(source), None)
+    assert select_precompressed(str(source), None) == (str(source), None)
+
+
+def test_select_precompressed_prefers_brotli_when_present(tmp_path):
+    source = tmp_path / "app.js"
+    _write(source, b"console.log('hello');\n" * 100)
+    _write(tmp_path / "app.js.gz", b"gz")
+    _write(tmp_path / "app.js.br", b"br")
+
+    assert select_precompressed(str(source), "gzip, br") == (str(source) + ".br", "br")
+    assert select_precompressed(str(source), "gzip") == (str(source) + ".gz", "gzip")
+
+
+def test_select_precompressed_ignores_stale_variant(tmp_path):
+    source = tmp_path / "app.js"
+    _write(source, b"console.log('hello');\n" * 100)
+    precompress_file(str(source))
+    stat_result = os.stat(source)
+    os.utime(source, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+
+    assert select_precompressed(str(source), "gzip") == (str(source), None)
+
+
+def test_load_compression_settings_reads_environment():
+    settings = load_compression_settings(
+        {
+            "RESPONSE_COMPRESSION_MIN_BYTES": "2048",
+            "RESPONSE_COMPRESSION_GZIP_LEVEL": "9",
+            "RESPONSE_COMPRESSION_SKIP_TYPES": "text/csv",
+        }
+    )
+    assert settings.enabled
+    assert settings.min_size == 2048
+    assert settings.gzip_level == 9
+    assert "text/csv" in settings.skip_content_types
+    assert not load_compression_settings({"RESPONSE_COMPRESSION": "off"}).enabled
+    with pytest.raises(ValueError):
+        load_compression_settings({"RESPONSE_COMPRESSION_GZIP_LEVEL": "12"})
+
+
+def test_is_compressible_content_type_skips_compressed_media():
+    assert is_compressible_content_type("text/html; charset=UTF-8")
+    assert is_compressible_content_type("application/json")
+    assert is_compressible_content_type("image/svg+xml")
+    assert not is_compressible_content_type("image/png")
+    assert not is_compressible_content_type("video/mp4")
+    assert not is_compressible_content_type("font/woff2")
+
+
+def _compressing_app(settings):
+    app = Microdot()
+    install_response_compression(app, settings)
+    page = "<p>" + "slide " * 1000 + "</p>"
+
+    @app.route("/page")
+    async def page_view(request):
+        return page, 200, {"Content-Type": "text/html", "ETag": '"page"'}
+
+    @app.route("/small")
+    async def small_view(request):
+        return "<p>hi</p>", 200, {"Content-Type": "text/html"}
+
+    @app.route("/image")
+    async def image_view(request):
+        return b"\0" * 4096, 200, {"Content-Type": "image/png"}
+
+    return app, page
+
+
+def test_response_compression_gzips_large_html():
+    app, page = _compressing_app(CompressionSettings())
+
+    async def run():
+        client = TestClient(app)
+        return await client.get("/page", headers={"Accept-Encoding": "gzip"})
+
+    response = asyncio.run(run())
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["ETag"] == 'W/"page"'
+    assert gzip.decompress(response.body).decode() == page
+
+
+def test_response_compression_skips_ineligible_responses():
+    app, page = _compressing_app(CompressionSettings())
+
+    async def run():
+        client = TestClient(app)
+        return (
+            await client.get("/page"),
+            await client.get("/small", headers={"Accept-Encoding": "gzip"}),
+            await client.get("/image", headers={"Accept-Encoding": "gzip"}),
+        )
+
+    identity, small, image = asyncio.run(run())
+    assert "Content-Encoding" not in identity.headers
+    assert identity.headers["Vary"] == "Accept-Encoding"
+    assert identity.text == page
+    assert "Content-Encoding" not in small.headers
+    assert "Content-Encoding" not in image.headers
+    assert "Vary" not in image.headers
+
+
+def test_response_compression_can_be_disabled():
+    app, _ = _compressing_app(CompressionSettings(enabled=False))
+
+    async def run():
+        client = TestClient(app)
+        return await client.get("/page", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in asyncio.run(run()).headers
+
+
+def test_page_etag_is_the_same_on_200_and_304():
+    settings = CompressionSettings()
+    app = Microdot()
+    install_response_compression(app, settings)
+    page = "<p>" + "slide " * 1000 + "</p>"
+
+    @app.route("/page")
+    async def page_view(request):
+        etag = negotiated_etag(request, '"page"', "text/html", settings)
+        headers = {"Content-Type": "text/html", "ETag": etag}
+        if request.headers.get("If-None-Match") == etag:
+            return "", 304, headers
+        return page, 200, headers
+
+    async def run():
+        client = TestClient(app)
+        return [
+            await client.get("/page", headers=headers)
+            for headers in (
+                {"Accept-Encoding": "gzip"},
+                {"Accept-Encoding": "gzip", "If-None-Match": 'W/"page"'},
+                {},
+                {"If-None-Match": '"page"'},
+            )
+        ]
+
+    compressed, compressed_304, identity, identity_304 = asyncio.run(run())
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed_304.status_code == 304
+    assert compressed.headers["ETag"] == compressed_304.headers["ETag"] == 'W/"page"'
+    assert identity_304.status_code == 304
+    assert identity.headers["ETag"] == identity_304.headers["ETag"] == '"page"'
@@ -0,0 +1,141 @@
+import os
+
+import pytest
+from jinja2 import DictLoader, Environment
+
+from http_cache import (
+    AssetFingerprints,
+    etag_matches,
+    file_etag,
+    format_http_date,
+    is_not_modified,
+    make_etag,
+    parse_max_age,
+    static_url_arguments,
+    templates_digest,
+)
+
+
+def test_make_etag_is_quoted_and_stable():
+    etag = make_etag("index", 3, "reg=success")
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("index", 3, "reg=success")
+    assert etag != make_etag("index", 4, "reg=success")
+
+
+def test_etag_matches_handles_lists_weak_tags_and_wildcard():
+    etag = '"abc"'
+
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"zzz", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abd"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_is_not_modified_prefers_if_none_match():
+    last_modified = 1_700_000_000
+    headers = {
+        "If-None-Match": '"other"',
+        "If-Modified-Since": format_http_date(last_modified),
+    }
+
+    assert not is_not_modified(headers, '"abc"', last_modified)
+
+
+def test_is_not_modified_falls_back_to_if_modified_since():
+    last_modified = 1_700_000_000.7
+
+    assert is_not_modified(
+        {"If-Modified-Since": format_http_date(last_modified)}, None, last_modified
+    )
+    assert not is_not_modified(
+        {"If-Modified-Since": format_http_date(last_modified - 10)}, None, last_modified
+    )
+    assert not is_not_modified({"If-Modified-Since": "garbage"}, None, last_modified)
+
+
+def test_templates_digest_changes_with_source():
+    templates = {"index.tmpl": "v1"}
+    env = Environment(loader=DictLoader(templates))
+    first = templates_digest(env, ["index.tmpl"])
+
+    templates["index.tmpl"] = "v2"
+
+    assert templates_digest(env, ["index.tmpl"]) != first
+
+
+def test_parse_max_age_validates_input():
+    assert parse_max_age(None) == 0
+    assert parse_max_age("60") == 60
+    assert parse_max_age("-5") == 0
+    with pytest.raises(ValueError):
+        parse_max_age("soon")
+
+
+def test_asset_fingerprints_build_versioned_urls(tmp_path):
+    static_dir = tmp_path / "static"
+    static_dir.mkdir()
+    (static_dir / "style.css").write_text("body {}", encoding="utf-8")
+    fingerprints = AssetFingerprints({"/static/": str(static_dir)})
+
+    url = fingerprints.url("/static/style.css")
+    path, _, fingerprint = url.partition("?v=")
+
+    assert path == "/static/style.css"
+    assert len(fingerprint) == 16
+    assert fingerprints.matches(str(static_dir / "style.css"), fingerprint)
+    assert not fingerprints.matches(str(static_dir / "style.css"), "stale")
+    assert fingerprints.url("/static/missing.css") == "/static/missing.css"
+    assert fingerprints.url("/elsewhere/a.css") == "/elsewhere/a.css"
+
+
+def test_asset_fingerprints_follow_file_changes_after_refresh(tmp_path, clock):
+    asset = tmp_path / "app.js"
+    asset.write_text("v1", encoding="utf-8")
+    fingerprints = AssetFingerprints({"/static/": str(tmp_path)}, refresh_interval=5, clock=clock)
+    first = fingerprints.url("/static/app.js")
+
+    asset.write_text("version 2", encoding="utf-8")
+    assert fingerprints.url("/static/app.js") == first
+
+    clock.now = 6
+    assert fingerprints.url("/static/app.js") != first
+
+
+def test_static_url_arguments_reads_literal_calls():
+    env = Environment(
+        loader=DictLoader(
+            {
+                "page.tmpl": "<link href=\"{{ static_url('/static/style.css') }}\">"
+                "{{ static_url(dynamic) }}",
+            }
+        )
+    )
+
+    assert static_url_arguments(env, ["page.tmpl"]) == ["/static/style.css"]
+
+
+def test_file_etag_uses_mtime_and_size(tmp_path):
+    asset = tmp_path / "a.txt"
+    asset.write_text("abc", encoding="utf-8")
+
+    etag = file_etag(os.stat(asset))
+
+    assert etag.startswith('"') and etag.endswith('-3"')
+
+
+def test_asset_fingerprints_version_covers_only_given_paths(tmp_path, clock):
+    (tmp_path / "app.js").write_text("v1", encoding="utf-8")
+    (tmp_path / "other.js").write_text("x", encoding="utf-8")
+    fingerprints = AssetFingerprints({"/static/": str(tmp_path)}, refresh_interval=5, clock=clock)
+    version = fingerprints.version(["/static/app.js"])
+
+    fingerprints.url("/static/other.js")
+    assert fingerprints.version(["/static/app.js"]) == version
+    assert AssetFingerprints({"/static/": str(tmp_path)}).version(["/static/app.js"]) == version
+
+    (tmp_path / "app.js").write_text("version 2", encoding="utf-8")
+    clock.now = 6
+    assert fingerprints.version(["/static/app.js"]) != version
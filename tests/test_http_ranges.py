@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from http_cache import format_http_date
+from http_ranges import (
+    RangeNotSatisfiable,
+    if_range_allows,
+    iter_file_range,
+    parse_range_header,
+)
+
+
+def test_parse_range_header_supports_open_closed_and_suffix_ranges():
+    assert parse_range_header("bytes=0-", 1000) == (0, 999)
+    assert parse_range_header("bytes=100-199", 1000) == (100, 199)
+    assert parse_range_header("bytes=900-5000", 1000) == (900, 999)
+    assert parse_range_header("bytes=-100", 1000) == (900, 999)
+    assert parse_range_header("bytes=-5000", 1000) == (0, 999)
+
+
+def test_parse_range_header_ignores_unsupported_forms():
+    assert parse_range_header(None, 1000) is None
+    assert parse_range_header("items=0-5", 1000) is None
+    assert parse_range_header("bytes=0-1,5-6", 1000) is None
+
+
+def test_parse_range_header_ignores_invalid_ranges():
+    for header in ("bytes=20-10", "bytes=abc-", "bytes=5", "bytes=-", "bytes=0-x", "bytes=+5-"):
+        assert parse_range_header(header, 1000) is None
+
+
+def test_parse_range_header_rejects_unsatisfiable_ranges():
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=1000-", 1000)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=-0", 1000)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=-10", 0)
+
+
+def test_if_range_allows_matching_validators_only():
+    etag = '"abc"'
+    last_modified = 1_700_000_000
+
+    assert if_range_allows(None, etag, last_modified)
+    assert if_range_allows('"abc"', etag, last_modified)
+    assert not if_range_allows('"old"', etag, last_modified)
+    assert not if_range_allows('W/"abc"', etag, last_modified)
+    assert if_range_allows(format_http_date(last_modified), etag, last_modified)
+    assert not if_range_allows(format_http_date(last_modified - 60), etag, last_modified)
+
+
+def test_iter_file_range_streams_requested_span_in_chunks(tmp_path):
+    media = tmp_path / "video.mp4"
+    payload = bytes(range(256)) * 40
+    media.write_bytes(payload)
+
+    async def collect():
+        return [chunk async for chunk in iter_file_range(str(media), 10, 5000, chunk_size=1024)]
+
+    chunks = asyncio.run(collect())
+
+    assert b"".join(chunks) == payload[10:5010]
+    assert max(len(chunk) for chunk in chunks) == 1024
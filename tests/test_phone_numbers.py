@@ -0,0 +1,25 @@
+from phone_numbers import (
+    format_phone_number,
+    is_valid_phone_number,
+    normalize_phone_digits,
+    phone_numbers_equal,
+)
+
+
+def test_normalize_phone_digits_accepts_common_russian_formats():
+    assert normalize_phone_digits("+7 (900) 123-45-67") == "79001234567"
+    assert normalize_phone_digits("89001234567") == "79001234567"
+    assert normalize_phone_digits("9001234567") == "79001234567"
+    assert normalize_phone_digits("12345") == ""
+    assert not is_valid_phone_number(None)
+
+
+def test_format_phone_number_uses_canonical_form():
+    assert format_phone_number("8 900 123 45 67") == "+7 (900) 123-45-67"
+    assert format_phone_number("abc") == ""
+
+
+def test_phone_numbers_equal_compares_normalized_digits():
+    assert phone_numbers_equal("+7 (900) 123-45-67", "89001234567")
+    assert not phone_numbers_equal("+7 (900) 123-45-67", "89001234568")
+    assert phone_numbers_equal("legacy", " legacy ")
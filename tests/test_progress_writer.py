@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from progress_writer import (
+    ProgressWriteBehind,
+    ProgressWriterSettings,
+    load_progress_writer_settings,
+)
+
+
+class RecordingWriter:
+    def __init__(self, fail_times=0):
+        self.batches = []
+        self.fail_times = fail_times
+
+    async def __call__(self, rows):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("database unavailable")
+        self.batches.append(sorted(rows))
+
+
+def test_load_progress_writer_settings_defaults_to_sync_mode():
+    assert load_progress_writer_settings({}) == ProgressWriterSettings()
+    settings = load_progress_writer_settings(
+        {
+            "PROGRESS_WRITE_MODE": "batched",
+            "PROGRESS_BATCH_SIZE": "50",
+            "PROGRESS_FLUSH_INTERVAL_SECONDS": "0.5",
+        }
+    )
+    assert settings.batched
+    assert settings.batch_size == 50
+    assert settings.flush_interval == 0.5
+    with pytest.raises(ValueError):
+        load_progress_writer_settings({"PROGRESS_WRITE_MODE": "eventually"})
+    with pytest.raises(ValueError):
+        load_progress_writer_settings({"PROGRESS_BATCH_SIZE": "0"})
+
+
+def test_write_behind_coalesces_duplicates_until_flush():
+    writer = RecordingWriter()
+
+    async def run():
+        queue = ProgressWriteBehind(writer, batch_size=100, flush_interval=60)
+        queue.add(1, "wifi")
+        queue.add(1, "wifi")
+        queue.add(2, "wifi")
+        pending = queue.pending_slugs(1)
+        written = await queue.close()
+        return queue, pending, written
+
+    queue, pending, written = asyncio.run(run())
+    assert pending == frozenset({"wifi"})
+    assert written == 2
+    assert writer.batches == [[(1, "wifi"), (2, "wifi")]]
+    assert queue.stats()["coalesced"] == 1
+
+
+def test_write_behind_flushes_when_batch_is_full():
+    writer = RecordingWriter()
+
+    async def run():
+        queue = ProgressWriteBehind(writer, batch_size=2, flush_interval=60)
+        queue.add(1, "a")
+        queue.add(1, "b")
+        await asyncio.sleep(0)
+        flushed_early = list(writer.batches)
+        await queue.close()
+        return flushed_early
+
+    assert asyncio.run(run()) == [[(1, "a"), (1, "b")]]
+
+
+def test_write_behind_flushes_on_interval():
+    writer = RecordingWriter()
+
+    async def run():
+        queue = ProgressWriteBehind(writer, batch_size=100, flush_interval=0.01)
+        queue.add(1, "a")
+        await asyncio.sleep(0.05)
+        flushed = list(writer.batches)
+        await queue.close()
+        return flushed
+
+    assert asyncio.run(run()) == [[(1, "a")]]
+
+
+def test_write_behind_requeues_rows_after_failed_flush():
+    writer = RecordingWriter(fail_times=1)
+
+    async def run():
+        queue = ProgressWriteBehind(writer, batch_size=100, flush_interval=60)
+        queue.add(1, "a")
+        assert await queue.flush() == 0
+        assert len(queue) == 1
+        queue.add(2, "b")
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(run())
+    assert writer.batches == [[(1, "a"), (2, "b")]]
+    assert queue.stats()["failed_flushes"] == 1
+
+
+def test_write_behind_discards_deleted_users():
+    writer = RecordingWriter()
+
+    async def run():
+        queue = ProgressWriteBehind(writer, batch_size=100, flush_interval=60)
+        queue.add(1, "a")
+        queue.add(2, "b")
+        queue.discard_user(1)
+        await queue.close()
+
+    asyncio.run(run())
+    assert writer.batches == [[(2, "b")]]
+
+
+def test_write_behind_close_waits_for_inflight_flush():
+    started = asyncio.Event()
+    release = asyncio.Event()
+    batches = []
+
+    async def slow_writer(rows):
+        started.set()
+        await release.wait()
+        batches.append(sorted(rows))
+
+    async def run():
+        queue = ProgressWriteBehind(slow_writer, batch_size=100, flush_interval=0.01)
+        queue.add(1, "a")
+        await started.wait()
+        closing = asyncio.create_task(queue.close())
+        await asyncio.sleep(0.01)
+        release.set()
+        await closing
+
+    asyncio.run(run())
+    assert batches == [[(1, "a")]]
+
+
+def test_write_behind_requeues_rows_of_cancelled_flush():
+    started = asyncio.Event()
+
+    async def hanging_writer(rows):
+        started.set()
+        await asyncio.Event().wait()
+
+    async def run():
+        queue = ProgressWriteBehind(hanging_writer, batch_size=100, flush_interval=60)
+        queue.add(1, "a")
+        flush = asyncio.create_task(queue.flush())
+        await started.wait()
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+        return queue
+
+    queue = asyncio.run(run())
+    assert queue.take_pending() == [(1, "a")]
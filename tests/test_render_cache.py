@@ -0,0 +1,110 @@
+import pytest
+from jinja2 import DictLoader, Environment
+
+from caching import LRUCache, parse_cache_entries, parse_cache_ttl
+from render_cache import FragmentCache, template_is_user_independent
+
+
+def make_env(templates):
+    return Environment(loader=DictLoader(templates), autoescape=True)
+
+
+def test_lru_cache_evicts_least_recently_used_by_byte_budget():
+    cache = LRUCache(max_bytes=10, sizeof=len)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    assert cache.get("a") == "aaaa"
+
+    cache.set("c", "cccc")
+
+    assert "b" not in cache
+    assert cache.get("a") == "aaaa"
+    assert cache.total_bytes == 8
+    assert cache.evictions == 1
+
+
+def test_lru_cache_skips_values_larger_than_budget():
+    cache = LRUCache(max_bytes=3, sizeof=len)
+    cache.set("a", "toolong")
+
+    assert len(cache) == 0
+    assert cache.total_bytes == 0
+
+
+def test_lru_cache_expires_entries_after_ttl(clock):
+    cache = LRUCache(ttl=5, clock=clock)
+    cache.set("a", 1)
+
+    clock.now = 4
+    assert cache.get("a") == 1
+    clock.now = 6
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_cache_entry_limit_and_pop():
+    cache = LRUCache(max_entries=2)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.set(3, "c")
+
+    assert 1 not in cache
+    assert cache.pop(2) == "b"
+    assert cache.pop(2) is None
+    assert len(cache) == 1
+
+
+def test_parse_cache_limits():
+    assert parse_cache_ttl("", 60.0) == 60.0
+    assert parse_cache_ttl("2.5", 60.0) == 2.5
+    assert parse_cache_entries("-1", 100) == 0
+    with pytest.raises(ValueError):
+        parse_cache_ttl("soon", 60.0)
+    with pytest.raises(ValueError):
+        parse_cache_entries("1.5", 100)
+
+
+def test_template_is_user_independent_detects_user_usage():
+    env = make_env(
+        {
+            "static.html": "<p>Hello</p>",
+            "dynamic.tmpl": "<p>{{ user[2] if user else '' }}</p>",
+            "include.tmpl": "{% include 'static.html' %}",
+            "local.tmpl": "{% set user = 'x' %}{{ user }}",
+        }
+    )
+
+    assert template_is_user_independent(env, "static.html")
+    assert not template_is_user_independent(env, "dynamic.tmpl")
+    assert not template_is_user_independent(env, "include.tmpl")
+    assert template_is_user_independent(env, "local.tmpl")
+
+
+def test_fragment_cache_reuses_static_fragments_until_generation_changes():
+    templates = {"static.html": "<p>v1</p>"}
+    fragments = FragmentCache(make_env(templates))
+
+    assert fragments.render("static.html", generation=1) == "<p>v1</p>"
+    templates["static.html"] = "<p>v2</p>"
+    assert fragments.render("static.html", generation=1) == "<p>v1</p>"
+    assert fragments.stats()["hits"] == 1
+
+    assert fragments.render("static.html", generation=2) == "<p>v2</p>"
+
+
+def test_fragment_cache_renders_user_dependent_templates_each_time():
+    fragments = FragmentCache(make_env({"dynamic.tmpl": "{{ user }}"}))
+
+    assert fragments.render("dynamic.tmpl", generation=1, user="Анна") == "Анна"
+    assert fragments.render("dynamic.tmpl", generation=1, user="Олег") == "Олег"
+    assert fragments.stats()["entries"] == 0
+
+
+def test_fragment_cache_honours_static_declaration():
+    fragments = FragmentCache(make_env({"dynamic.tmpl": "[{{ user }}]"}))
+
+    first = fragments.render("dynamic.tmpl", generation=1, static_content=True, user="Анна")
+    second = fragments.render("dynamic.tmpl", generation=1, static_content=True, user="Олег")
+
+    assert first == second == "[]"
@@ -0,0 +1,135 @@
+from types import SimpleNamespace
+
+import pytest
+from jinja2 import Environment, FileSystemLoader
+
+from template_cache import (
+    DEFAULT_TEMPLATE_BYTECODE_DIR,
+    CatalogTemplateCache,
+    TemplateLRUCache,
+    TemplateSettings,
+    compilable_template_names,
+    create_bytecode_cache,
+    load_bytecode_cache_dir,
+    load_template_settings,
+    precompile_templates,
+    template_cache_size,
+)
+
+
+def _environment(templates_dir, cache_dir):
+    return Environment(
+        loader=FileSystemLoader(str(templates_dir)),
+        bytecode_cache=create_bytecode_cache(str(cache_dir)),
+    )
+
+
+def test_load_bytecode_cache_dir_reads_environment(tmp_path):
+    assert load_bytecode_cache_dir({}) == DEFAULT_TEMPLATE_BYTECODE_DIR
+    assert load_bytecode_cache_dir({"TEMPLATE_BYTECODE_CACHE_DIR": str(tmp_path)}) == str(tmp_path)
+    assert load_bytecode_cache_dir({"TEMPLATE_BYTECODE_CACHE_DIR": "off"}) is None
+
+
+def test_precompile_skips_assets_and_reports_invalid_templates(tmp_path):
+    templates = tmp_path / "templates"
+    (templates / "tutorials" / "wifi").mkdir(parents=True)
+    (templates / "index.tmpl").write_text("<p>{{ title }}</p>", encoding="utf-8")
+    (templates / "tutorials" / "wifi" / "1.html").write_text("<p>slide</p>", encoding="utf-8")
+    (templates / "tutorials" / "wifi" / "2.html").write_text("{% if %}", encoding="utf-8")
+    (templates / "tutorials" / "wifi" / "meta.json").write_text("{}", encoding="utf-8")
+    (templates / "tutorials" / "wifi" / "1.html.gz").write_bytes(b"\x1f\x8b")
+    env = _environment(templates, tmp_path / "cache")
+
+    assert compilable_template_names(env) == [
+        "index.tmpl",
+        "tutorials/wifi/1.html",
+        "tutorials/wifi/2.html",
+    ]
+    compiled, failed = precompile_templates(env)
+    assert compiled == ["index.tmpl", "tutorials/wifi/1.html"]
+    assert [name for name, _ in failed] == ["tutorials/wifi/2.html"]
+    assert len(list((tmp_path / "cache").iterdir())) == 2
+
+
+def test_fresh_environment_loads_precompiled_bytecode(tmp_path, monkeypatch):
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "index.tmpl").write_text("<p>{{ title }}</p>", encoding="utf-8")
+    precompile_templates(_environment(templates, tmp_path / "cache"))
+
+    env = _environment(templates, tmp_path / "cache")
+    compiled_sources = []
+    original_compile = env.compile
+    monkeypatch.setattr(
+        env,
+        "compile",
+        lambda source, *args, **kwargs: compiled_sources.append(source)
+        or original_compile(source, *args, **kwargs),
+    )
+
+    assert env.get_template("index.tmpl").render(title="Wi-Fi") == "<p>Wi-Fi</p>"
+    assert compiled_sources == []
+
+
+def test_load_template_settings_defaults_to_production_policy():
+    assert load_template_settings({}) == TemplateSettings(auto_reload=False, cache_size=None)
+    settings = load_template_settings({"TEMPLATE_AUTO_RELOAD": "on", "TEMPLATE_CACHE_SIZE": "800"})
+    assert settings == TemplateSettings(auto_reload=True, cache_size=800)
+    with pytest.raises(ValueError):
+        load_template_settings({"TEMPLATE_CACHE_SIZE": "0"})
+    with pytest.raises(ValueError):
+        load_template_settings({"TEMPLATE_AUTO_RELOAD": "sometimes"})
+
+
+def test_template_lru_cache_counts_hits_misses_and_evictions():
+    cache = TemplateLRUCache(2)
+    assert cache.get("a") is None
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+
+    assert cache.stats() == {
+        "entries": 2,
+        "capacity": 2,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def _snapshot(generation, *page_counts):
+    manifests = {
+        f"tutorial-{index}": SimpleNamespace(total_pages=pages)
+        for index, pages in enumerate(page_counts)
+    }
+    return SimpleNamespace(generation=generation, manifests=manifests)
+
+
+def test_catalog_template_cache_reloads_templates_only_on_new_generation(tmp_path):
+    slide = tmp_path / "1.tmpl"
+    slide.write_text("first", encoding="utf-8")
+    env = Environment(loader=FileSystemLoader(str(tmp_path)), auto_reload=False)
+    env.cache = TemplateLRUCache(400)
+    templates = CatalogTemplateCache(env, TemplateSettings(), page_templates=10)
+
+    assert templates.sync(_snapshot(1, 20, 10))
+    assert env.cache.capacity == template_cache_size(10, 30) == 50
+    assert env.get_template("1.tmpl").render() == "first"
+
+    slide.write_text("second", encoding="utf-8")
+    assert not templates.sync(_snapshot(1, 20, 10))
+    assert env.get_template("1.tmpl").render() == "first"
+
+    assert templates.sync(_snapshot(2, 20, 10, 30))
+    assert env.cache.capacity == 88
+    assert env.get_template("1.tmpl").render() == "second"
+    assert templates.stats()["generation"] == 2
+
+
+def test_catalog_template_cache_keeps_explicit_size():
+    env = Environment()
+    env.cache = TemplateLRUCache(400)
+    templates = CatalogTemplateCache(env, TemplateSettings(cache_size=1000), page_templates=10)
+    templates.sync(_snapshot(1, 20))
+    assert env.cache.capacity == 1000
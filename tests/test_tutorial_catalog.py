@@ -0,0 +1,220 @@
+import json
+import os
+
+import pytest
+
+from tutorial_catalog import TutorialCatalog, normalize_tutorial_slug
+
+
+def write_tutorial(root, directory_name, meta=None, pages=("1.tmpl",)):
+    tutorial_path = root / directory_name
+    tutorial_path.mkdir()
+    for page in pages:
+        (tutorial_path / page).write_text("<p>page</p>", encoding="utf-8")
+    if meta is not None:
+        (tutorial_path / "meta.json").write_text(
+            json.dumps(meta, ensure_ascii=False), encoding="utf-8"
+        )
+    return tutorial_path
+
+
+def test_normalize_tutorial_slug_applies_renames():
+    assert normalize_tutorial_slug(" RustoreDowload ") == "rustoredownload"
+    assert normalize_tutorial_slug("wificonnect") == "wificonnect"
+
+
+def test_catalog_parses_meta_and_hides_invisible_tutorials(tmp_path):
+    write_tutorial(
+        tmp_path,
+        "alpha",
+        {"title": "Альфа", "level": "ADVANCED", "order": "7", "course": "gosuslugi"},
+    )
+    write_tutorial(tmp_path, "hidden", {"visible_in_interface": "false"})
+    write_tutorial(tmp_path, "no-pages", {"title": "Пусто"}, pages=())
+
+    catalog = TutorialCatalog(str(tmp_path))
+
+    visible = catalog.tutorials()
+    assert [t["slug"] for t in visible] == ["alpha"]
+    assert visible[0]["level"] == "advanced"
+    assert visible[0]["order"] == 7
+    assert visible[0]["course"] == "gosuslugi"
+    assert [t["slug"] for t in catalog.tutorials(include_hidden=True)] == [
+        "alpha",
+        "hidden",
+    ]
+    assert catalog.get("hidden")["level"] == "basic"
+
+
+def test_catalog_dedupes_renamed_directories(tmp_path):
+    write_tutorial(tmp_path, "rustoredowload", {"title": "Старое имя"})
+    write_tutorial(tmp_path, "rustoredownload", {"title": "Новое имя"})
+
+    catalog = TutorialCatalog(str(tmp_path))
+
+    tutorials = catalog.tutorials()
+    assert len(tutorials) == 1
+    assert tutorials[0]["directory"] == "rustoredowload"
+
+
+def test_catalog_reuses_snapshot_until_refresh_interval(tmp_path, clock):
+    write_tutorial(tmp_path, "alpha", {"title": "Альфа"})
+    catalog = TutorialCatalog(str(tmp_path), refresh_interval=10, clock=clock)
+
+    first = catalog.snapshot()
+    write_tutorial(tmp_path, "beta", {"title": "Бета"})
+
+    assert catalog.snapshot() is first
+
+    clock.now = 11
+    second = catalog.snapshot()
+    assert second.generation == first.generation + 1
+    assert [t["slug"] for t in second.tutorials] == ["alpha", "beta"]
+
+
+def test_catalog_keeps_generation_when_tree_is_unchanged(tmp_path, clock):
+    write_tutorial(tmp_path, "alpha", {"title": "Альфа"})
+    catalog = TutorialCatalog(str(tmp_path), refresh_interval=1, clock=clock)
+
+    first = catalog.snapshot()
+    clock.now = 5
+
+    assert catalog.snapshot() is first
+
+
+def test_catalog_detects_meta_changes(tmp_path, clock):
+    tutorial_path = write_tutorial(tmp_path, "alpha", {"title": "Альфа"})
+    catalog = TutorialCatalog(str(tmp_path), refresh_interval=1, clock=clock)
+    catalog.snapshot()
+
+    meta_path = tutorial_path / "meta.json"
+    meta_path.write_text(json.dumps({"title": "Альфа 2"}), encoding="utf-8")
+    stat = meta_path.stat()
+    os.utime(meta_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+    clock.now = 2
+
+    assert catalog.get("alpha")["title"] == "Альфа 2"
+
+
+def test_catalog_invalidate_forces_rebuild(tmp_path):
+    write_tutorial(tmp_path, "alpha", {"title": "Альфа"})
+    catalog = TutorialCatalog(str(tmp_path), refresh_interval=3600)
+    first = catalog.snapshot()
+
+    catalog.invalidate()
+
+    assert catalog.snapshot().generation == first.generation + 1
+
+
+COURSE_DEFINITIONS = [
+    {"slug": "c1", "title": "Курс 1", "description": "Описание 1"},
+    {"slug": "c2", "title": "Курс 2", "description": "Описание 2"},
+]
+
+
+def test_catalog_groups_courses_by_level_and_order(tmp_path):
+    write_tutorial(tmp_path, "a", {"title": "A", "course": "c1", "order": 2})
+    write_tutorial(tmp_path, "b", {"title": "B", "course": "c1", "order": 1})
+    write_tutorial(tmp_path, "c", {"title": "C", "course": "c1", "level": "advanced"})
+    write_tutorial(tmp_path, "d", {"title": "D", "course": "unknown"})
+    write_tutorial(
+        tmp_path, "e", {"title": "E", "course": "c1", "visible_in_interface": False}
+    )
+
+    catalog = TutorialCatalog(str(tmp_path), course_definitions=COURSE_DEFINITIONS)
+
+    course = catalog.get_course("C1")
+    assert [m["slug"] for m in course["basic_modules"]] == ["b", "a"]
+    assert [m["slug"] for m in course["advanced_modules"]] == ["b", "a", "c"]
+    assert dict(course["advanced_index"]) == {"b": 0, "a": 1, "c": 2}
+    assert course["basic_count_label"] == "2 модуля"
+    assert course["advanced_url"] == "/tutorials/course/c1/advanced"
+    assert catalog.get_course("c2")["module_count"] == 0
+    assert [c["slug"] for c in catalog.courses()] == ["c1", "c2"]
+
+
+def test_catalog_courses_are_shared_and_read_only(tmp_path):
+    write_tutorial(tmp_path, "a", {"title": "A", "course": "c1"})
+    catalog = TutorialCatalog(str(tmp_path), course_definitions=COURSE_DEFINITIONS)
+
+    first = catalog.courses()
+
+    assert catalog.courses() is first
+    with pytest.raises(TypeError):
+        first[0]["module_count"] = 5
+
+
+def test_catalog_resolves_directories_for_slugs_and_aliases(tmp_path):
+    write_tutorial(tmp_path, "RustoreDownload", {"title": "RuStore"})
+    write_tutorial(tmp_path, "hidden", {"visible_in_interface": False})
+
+    catalog = TutorialCatalog(str(tmp_path))
+
+    assert catalog.resolve_directory("rustoredownload") == "RustoreDownload"
+    assert catalog.resolve_directory("rustoredowload") == "RustoreDownload"
+    assert catalog.resolve_directory(" RUSTOREDOWNLOAD ") == "RustoreDownload"
+    assert catalog.resolve_directory("hidden") == "hidden"
+    assert catalog.resolve_directory("missing") is None
+
+
+def test_catalog_builds_ordered_page_manifest(tmp_path):
+    write_tutorial(
+        tmp_path,
+        "alpha",
+        {"title": "Альфа"},
+        pages=("10.tmpl", "2.html", "1.tmpl", "intro.htm", "notes.txt"),
+    )
+
+    manifest = TutorialCatalog(str(tmp_path)).manifest("alpha")
+
+    assert manifest.directory == "alpha"
+    assert manifest.pages == ("1.tmpl", "2.html", "10.tmpl", "intro.htm")
+    assert manifest.total_pages == 4
+    assert manifest.viewer_navigation == "pages"
+
+
+def test_catalog_manifest_validates_style_options(tmp_path):
+    write_tutorial(
+        tmp_path,
+        "switch",
+        {
+            "viewer_navigation": "style-switch",
+            "style_options": [
+                {"label": "Видео", "page": 1},
+                {"label": "Симулятор", "page": 2},
+                {"label": "Лишняя", "page": 3},
+                {"label": "", "page": 1},
+            ],
+        },
+        pages=("1.tmpl", "2.tmpl"),
+    )
+    write_tutorial(
+        tmp_path,
+        "single",
+        {"viewer_navigation": "style-switch", "style_options": [{"label": "Видео", "page": 1}]},
+        pages=("1.tmpl", "2.tmpl"),
+    )
+
+    catalog = TutorialCatalog(str(tmp_path))
+
+    switch = catalog.manifest("switch")
+    assert switch.viewer_navigation == "style-switch"
+    assert [dict(option) for option in switch.style_options] == [
+        {"label": "Видео", "page": 1},
+        {"label": "Симулятор", "page": 2},
+    ]
+    single = catalog.manifest("single")
+    assert single.viewer_navigation == "pages"
+    assert single.style_options == ()
+
+
+def test_catalog_detects_page_edits(tmp_path, clock):
+    tutorial_path = write_tutorial(tmp_path, "alpha", {"title": "Альфа"})
+    catalog = TutorialCatalog(str(tmp_path), refresh_interval=1, clock=clock)
+    first = catalog.snapshot()
+
+    page_path = tutorial_path / "1.tmpl"
+    page_path.write_text("<p>changed page</p>", encoding="utf-8")
+    clock.now = 2
+
+    assert catalog.snapshot().generation == first.generation + 1
@@ -0,0 +1,430 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Mapping
+
+from progress_metrics import format_module_count
+
+TUTORIAL_PAGE_EXTENSIONS = (".tmpl", ".html", ".htm")
+TUTORIAL_META_FILENAME = "meta.json"
+DIFFICULTY_LEVELS = ("basic", "advanced")
+DEFAULT_COURSE_SLUG = "smartphone-basics"
+TUTORIAL_SLUG_RENAMES = {
+    "rustoredowload": "rustoredownload",
+}
+DEFAULT_REFRESH_INTERVAL = 5.0
+
+
+def normalize_tutorial_slug(slug: str) -> str:
+    raw_slug = (slug or "").strip().lower()
+    return TUTORIAL_SLUG_RENAMES.get(raw_slug, raw_slug)
+
+
+def is_tutorial_page(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in TUTORIAL_PAGE_EXTENSIONS
+
+
+def parse_refresh_interval(raw_value: str | None) -> float:
+    value = (raw_value or "").strip()
+    if not value:
+        return DEFAULT_REFRESH_INTERVAL
+    try:
+        interval = float(value)
+    except ValueError as exc:
+        raise ValueError(
+            "TUTORIAL_CATALOG_REFRESH_SECONDS must be a number of seconds."
+        ) from exc
+    return max(interval, 0.0)
+
+
+def read_tutorial_meta(meta_path: str) -> dict:
+    if not os.path.exists(meta_path):
+        return {}
+    try:
+        with open(meta_path, encoding="utf-8") as meta_file:
+            meta = json.load(meta_file)
+    except Exception:
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+
+def _parse_flag(meta: Mapping[str, Any], key: str, default: bool | None) -> bool | None:
+    if key not in meta:
+        return default
+    value = meta[key]
+    if isinstance(value, str):
+        return value.strip().lower() not in ("0", "false", "no")
+    return bool(value)
+
+
+def build_tutorial_entry(slug: str, directory_name: str, meta: Mapping[str, Any]):
+    level = str(meta.get("level", "basic")).lower()
+    if level not in DIFFICULTY_LEVELS:
+        level = "basic"
+
+    order = meta.get("order")
+    try:
+        order = int(str(order).strip())
+    except (TypeError, ValueError):
+        order = 1000
+
+    visible_in_interface = _parse_flag(meta, "visible_in_interface", True)
+
+    course = str(meta.get("course", DEFAULT_COURSE_SLUG)).strip() or DEFAULT_COURSE_SLUG
+    viewer_navigation = str(meta.get("viewer_navigation", "pages")).strip().lower()
+    if viewer_navigation not in ("pages", "style-switch"):
+        viewer_navigation = "pages"
+
+    style_options = meta.get("style_options")
+    if not isinstance(style_options, list):
+        style_options = []
+
+    return MappingProxyType(
+        {
+            "slug": slug,
+            "directory": directory_name,
+            "title": meta.get("title") or slug,
+            "description": meta.get("description") or "Описание появится позже.",
+            "level": level,
+            "course": course,
+            "viewer_navigation": viewer_navigation,
+            "style_options": tuple(style_options),
+            "order": order,
+            "visible_in_interface": visible_in_interface,
+            "static_content": _parse_flag(meta, "static_content", None),
+        }
+    )
+
+
+def _page_signature(tutorial_path: str) -> tuple:
+    pages = []
+    try:
+        with os.scandir(tutorial_path) as page_entries:
+            for page_entry in page_entries:
+                if not is_tutorial_page(page_entry.name):
+                    continue
+                try:
+                    page_stat = page_entry.stat()
+                except OSError:
+                    continue
+                pages.append((page_entry.name, page_stat.st_mtime_ns, page_stat.st_size))
+    except OSError:
+        return ()
+    pages.sort()
+    return tuple(pages)
+
+
+def scan_catalog_signature(tutorials_dir: str) -> tuple:
+    """Cheap stat-only fingerprint of the tutorials tree.
+
+    Covers the tutorial directories, their ``meta.json`` files and page
+    templates, so adding a tutorial, editing metadata or editing a slide all
+    produce a new signature without reading any file contents.
+    """
+    entries = []
+    try:
+        with os.scandir(tutorials_dir) as directory_entries:
+            for entry in directory_entries:
+                if not entry.is_dir():
+                    continue
+                try:
+                    meta_stat = os.stat(os.path.join(entry.path, TUTORIAL_META_FILENAME))
+                    meta_signature = (meta_stat.st_mtime_ns, meta_stat.st_size)
+                except OSError:
+                    meta_signature = None
+                entries.append((entry.name, meta_signature, _page_signature(entry.path)))
+    except OSError:
+        return ()
+    entries.sort()
+    return tuple(entries)
+
+
+def _tutorial_sort_key(filename: str):
+    """Sort tutorial pages numerically when possible, otherwise alphabetically."""
+    stem, _ = os.path.splitext(filename)
+    try:
+        return (0, int(stem))
+    except ValueError:
+        return (1, stem.lower())
+
+
+@dataclass(frozen=True)
+class TutorialManifest:
+    directory: str
+    pages: tuple
+    viewer_navigation: str = "pages"
+    style_options: tuple = ()
+
+    @property
+    def total_pages(self) -> int:
+        return len(self.pages)
+
+
+def build_tutorial_manifest(tutorial: Mapping[str, Any], page_files: Iterable[str]):
+    """Order tutorial pages and validate style-switch options against them."""
+    pages = tuple(sorted(page_files, key=_tutorial_sort_key))
+    total_pages = len(pages)
+
+    viewer_navigation = tutorial["viewer_navigation"]
+    style_options = []
+    if viewer_navigation == "style-switch":
+        for item in tutorial.get("style_options", ()):
+            if not isinstance(item, dict):
+                continue
+            option_label = str(item.get("label", "")).strip()
+            option_page = item.get("page")
+            if not option_label or not isinstance(option_page, int):
+                continue
+            if option_page < 1 or option_page > total_pages:
+                continue
+            style_options.append(
+                MappingProxyType({"label": option_label, "page": option_page})
+            )
+        if len(style_options) < 2:
+            viewer_navigation = "pages"
+            style_options = []
+
+    return TutorialManifest(
+        directory=tutorial["directory"],
+        pages=pages,
+        viewer_navigation=viewer_navigation,
+        style_options=tuple(style_options),
+    )
+
+
+def _tutorial_module_sort_key(tutorial):
+    """Stable sorting for tutorial cards inside courses."""
+    return (
+        int(tutorial.get("order", 1000)),
+        str(tutorial.get("title", "")).casefold(),
+        str(tutorial.get("slug", "")),
+    )
+
+
+def _dedupe_tutorials(tutorials):
+    """Remove duplicate tutorial slugs while preserving order."""
+    seen = set()
+    unique = []
+    for tutorial in tutorials:
+        slug = tutorial.get("slug")
+        if not slug or slug in seen:
+            continue
+        seen.add(slug)
+        unique.append(tutorial)
+    return unique
+
+
+def _module_index(modules: Iterable[Mapping[str, Any]]):
+    return MappingProxyType({module["slug"]: idx for idx, module in enumerate(modules)})
+
+
+def build_courses(tutorials: Iterable[Mapping[str, Any]], course_definitions: Iterable[Mapping[str, Any]]):
+    """Group tutorials into read-only courses with counts, labels and slug indexes."""
+    grouped = {}
+    for definition in course_definitions:
+        grouped[definition["slug"]] = ([], [])
+
+    for tutorial in tutorials:
+        course_slug = str(tutorial.get("course") or DEFAULT_COURSE_SLUG).strip()
+        groups = grouped.get(course_slug)
+        if groups is None:
+            continue
+        basic_modules, advanced_only_modules = groups
+        if tutorial.get("level") == "advanced":
+            advanced_only_modules.append(tutorial)
+        else:
+            basic_modules.append(tutorial)
+
+    courses = []
+    for definition in course_definitions:
+        slug = definition["slug"]
+        basic_modules, advanced_only_modules = grouped[slug]
+        basic_modules = tuple(sorted(basic_modules, key=_tutorial_module_sort_key))
+        advanced_only_modules = tuple(
+            sorted(advanced_only_modules, key=_tutorial_module_sort_key)
+        )
+        advanced_modules = tuple(_dedupe_tutorials(basic_modules + advanced_only_modules))
+
+        module_count = len(advanced_modules)
+        basic_count = len(basic_modules)
+        advanced_count = len(advanced_modules)
+        courses.append(
+            MappingProxyType(
+                {
+                    "slug": slug,
+                    "title": definition["title"],
+                    "description": definition["description"],
+                    "basic_description": definition.get("basic_description", ""),
+                    "advanced_description": definition.get("advanced_description", ""),
+                    "basic_modules": basic_modules,
+                    "advanced_only_modules": advanced_only_modules,
+                    "advanced_modules": advanced_modules,
+                    "basic_index": _module_index(basic_modules),
+                    "advanced_index": _module_index(advanced_modules),
+                    "module_count": module_count,
+                    "basic_count": basic_count,
+                    "advanced_count": advanced_count,
+                    "module_count_label": format_module_count(module_count),
+                    "basic_count_label": format_module_count(basic_count),
+                    "advanced_count_label": format_module_count(advanced_count),
+                    "basic_url": f"/tutorials/course/{slug}/basic",
+                    "advanced_url": f"/tutorials/course/{slug}/advanced",
+                }
+            )
+        )
+    return tuple(courses)
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    generation: int
+    signature: tuple | None
+    tutorials: tuple
+    visible_tutorials: tuple
+    by_slug: Mapping[str, Mapping[str, Any]]
+    courses: tuple = ()
+    course_by_slug: Mapping[str, Mapping[str, Any]] = MappingProxyType({})
+    directory_by_slug: Mapping[str, str] = MappingProxyType({})
+    manifests: Mapping[str, TutorialManifest] = MappingProxyType({})
+    fingerprint: str = ""
+    built_at: float = 0.0
+
+
+def build_directory_map(by_slug: Mapping[str, Mapping[str, Any]]):
+    """Map canonical slugs and their legacy aliases to tutorial directories."""
+    directories = {slug: tutorial["directory"] for slug, tutorial in by_slug.items()}
+    for alias, canonical_slug in TUTORIAL_SLUG_RENAMES.items():
+        directory_name = directories.get(canonical_slug)
+        if directory_name:
+            directories.setdefault(alias, directory_name)
+    return MappingProxyType(directories)
+
+
+def build_catalog_snapshot(
+    tutorials_dir: str,
+    generation: int,
+    signature: tuple,
+    course_definitions: Iterable[Mapping[str, Any]] = (),
+):
+    tutorials = []
+    by_slug = {}
+    manifests = {}
+
+    if not os.path.exists(tutorials_dir):
+        try:
+            os.makedirs(tutorials_dir, exist_ok=True)
+        except OSError:
+            pass
+
+    try:
+        directory_names = sorted(os.listdir(tutorials_dir))
+    except OSError:
+        directory_names = []
+
+    for directory_name in directory_names:
+        tutorial_path = os.path.join(tutorials_dir, directory_name)
+        if not os.path.isdir(tutorial_path):
+            continue
+
+        page_files = [f for f in os.listdir(tutorial_path) if is_tutorial_page(f)]
+        if not page_files:
+            continue
+
+        slug = normalize_tutorial_slug(directory_name)
+        if slug in by_slug:
+            continue
+
+        meta = read_tutorial_meta(os.path.join(tutorial_path, TUTORIAL_META_FILENAME))
+        entry = build_tutorial_entry(slug, directory_name, meta)
+        by_slug[slug] = entry
+        manifests[slug] = build_tutorial_manifest(entry, page_files)
+        tutorials.append(entry)
+
+    visible_tutorials = tuple(t for t in tutorials if t["visible_in_interface"])
+    courses = build_courses(visible_tutorials, course_definitions)
+    return CatalogSnapshot(
+        generation=generation,
+        signature=signature,
+        tutorials=tuple(tutorials),
+        visible_tutorials=visible_tutorials,
+        by_slug=MappingProxyType(by_slug),
+        courses=courses,
+        course_by_slug=MappingProxyType({course["slug"]: course for course in courses}),
+        directory_by_slug=build_directory_map(by_slug),
+        manifests=MappingProxyType(manifests),
+        fingerprint=hashlib.sha1(repr(signature).encode("utf-8")).hexdigest(),
+        built_at=time.time(),
+    )
+
+
+class TutorialCatalog:
+    """Process-wide tutorial index, rebuilt only when the tree changes on disk.
+
+    Between revalidations (at most once per ``refresh_interval`` seconds)
+    lookups are served from the current snapshot without touching the
+    filesystem. Each rebuild bumps ``generation``, so derived caches can key
+    on it.
+    """
+
+    def __init__(
+        self,
+        tutorials_dir: str,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+        course_definitions: Iterable[Mapping[str, Any]] = (),
+    ):
+        self.tutorials_dir = tutorials_dir
+        self.course_definitions = tuple(course_definitions)
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._snapshot: CatalogSnapshot | None = None
+        self._next_check = 0.0
+
+    def snapshot(self) -> CatalogSnapshot:
+        now = self._clock()
+        if self._snapshot is not None and now < self._next_check:
+            return self._snapshot
+        self._next_check = now + self.refresh_interval
+
+        signature = scan_catalog_signature(self.tutorials_dir)
+        if self._snapshot is None or signature != self._snapshot.signature:
+            generation = self._snapshot.generation + 1 if self._snapshot else 1
+            self._snapshot = build_catalog_snapshot(
+                self.tutorials_dir, generation, signature, self.course_definitions
+            )
+        return self._snapshot
+
+    def invalidate(self):
+        self._next_check = 0.0
+        if self._snapshot is not None:
+            self._snapshot = replace(self._snapshot, signature=None)
+
+    def tutorials(self, include_hidden: bool = False) -> tuple:
+        snapshot = self.snapshot()
+        if include_hidden:
+            return snapshot.tutorials
+        return snapshot.visible_tutorials
+
+    def get(self, slug: str):
+        return self.snapshot().by_slug.get(normalize_tutorial_slug(slug))
+
+    def resolve_directory(self, slug: str):
+        directories = self.snapshot().directory_by_slug
+        directory_name = directories.get(slug)
+        if directory_name is None:
+            directory_name = directories.get(normalize_tutorial_slug(slug))
+        return directory_name
+
+    def manifest(self, slug: str):
+        return self.snapshot().manifests.get(normalize_tutorial_slug(slug))
+
+    def courses(self) -> tuple:
+        return self.snapshot().courses
+
+    def get_course(self, course_slug: str):
+        return self.snapshot().course_by_slug.get(str(course_slug or "").strip().lower())